@@ -0,0 +1,194 @@
+# aggregate.py
+from array import array
+import json
+import time
+from knobs import knobs
+from tracer import traced
+
+try:
+    from secrets import AGGREGATE_TOPIC
+except ImportError:
+    AGGREGATE_TOPIC = "Aggregate"
+
+# Length of the tumbling windows (s); 0 disables the aggregation
+WINDOW = knobs.define("aggregate.window_s", 60, 0, 86400)
+# Sensors per published message, keeps each message small
+AGGREGATE_BATCH = 32
+# Published timestamps are Unix time; most ports count from 2000-01-01
+_UNIX_OFFSET = 946684800 if time.gmtime(0)[0] == 2000 else 0
+_INF = float("inf")
+
+
+def parse_value(msg):
+    """
+    Returns the number of the "value" field of a sensor message, or None
+    if it is missing or not finite (NaN would stick in min/max and is not
+    valid JSON).
+
+    Only the value is scanned for, which is much cheaper than json.loads()
+    on every message of the raw stream.
+    """
+    start = msg.find(b'"value"')
+    if start < 0:
+        return None
+    start = msg.find(b":", start + 7)
+    if start < 0:
+        return None
+    end = len(msg)
+    for delimiter in (b",", b"}"):
+        found = msg.find(delimiter, start)
+        if 0 <= found < end:
+            end = found
+    try:
+        # Numbers may also be sent as strings
+        value = float(bytes(msg[start + 1:end]).decode().strip().strip('"'))
+    except ValueError:
+        return None
+    if value != value or value in (_INF, -_INF):
+        return None
+    return value
+
+
+class SensorAggregator:
+    """
+    Rolls sensor readings up into tumbling windows and publishes the
+    min, max, mean and count of every sensor once per window.
+
+    The aggregator taps the raw MQTT stream (see on_message()), ahead of
+    the rate limit that coalesces the readings shown on the display, so
+    every reading counts. Every sensor has one slot in parallel arrays
+    holding the running min, max, sum and count, so memory is constant per
+    sensor regardless of the reading rate. Windows are aligned to the wall
+    clock, so all units cover the same intervals. A window is published to
+    "<AGGREGATE_TOPIC>/<client id>" as JSON objects of at most
+    AGGREGATE_BATCH sensors:
+
+        {"start": 1700000040, "window": 60,
+         "sensors": {"Kueche": [20.5, 21.0, 20.75, 12]}}
+
+    "start" is Unix time. Sensors without readings in a window are left
+    out, and windows that started before the clock was synced are dropped.
+    """
+
+    def __init__(self, mqtt, topic=AGGREGATE_TOPIC):
+        """
+        Initializes the SensorAggregator.
+
+        Args:
+            mqtt: The MQTT client instance used for publishing.
+            topic: Base topic of the aggregates.
+        """
+        self.mqtt = mqtt
+        client_id = mqtt.client_id.decode() if isinstance(mqtt.client_id, bytes) else mqtt.client_id
+        self.topic = f"{topic}/{client_id}"
+        self.slots = {}
+        self.names = []
+        self.mins = array("f")
+        self.maxs = array("f")
+        self.sums = array("f")
+        self.counts = array("I")
+        self.window = WINDOW.value
+        self.start = self._window_start()
+        self.windows = 0
+        self.messages = 0
+        self._callback = self.on_window
+        knobs.watch(WINDOW.name, self._callback)
+
+    def _window_start(self):
+        if not self.window:
+            return 0
+        now = int(time.time())
+        return now - now % self.window
+
+    def on_message(self, topic, msg):
+        """
+        MQTT tap: adds the reading of a "Sensor/<name>" message.
+        """
+        value = parse_value(msg)
+        if value is not None:
+            self.add(topic[topic.rfind(b"/") + 1:], value)
+
+    def add(self, name, value):
+        """
+        Adds a numeric reading to the current window.
+
+        Args:
+            name: The sensor name as bytes, as in the topic.
+            value: The reading.
+        """
+        if not self.window:
+            return
+        slot = self.slots.get(name)
+        if slot is None:
+            self.slots[name] = len(self.names)
+            self.names.append(name)
+            self.mins.append(value)
+            self.maxs.append(value)
+            self.sums.append(value)
+            self.counts.append(1)
+            return
+        if self.counts[slot] == 0:
+            self.mins[slot] = value
+            self.maxs[slot] = value
+            self.sums[slot] = value
+        else:
+            if value < self.mins[slot]:
+                self.mins[slot] = value
+            if value > self.maxs[slot]:
+                self.maxs[slot] = value
+            self.sums[slot] += value
+        self.counts[slot] += 1
+
+    def poll(self):
+        """
+        Publishes the window once it has ended. Call from the main loop.
+        """
+        if not self.window:
+            return
+        start = self._window_start()
+        if start != self.start:
+            self.flush()
+            self.start = start
+
+    def on_window(self, name, value):
+        """
+        Knob watcher: publishes the running window and starts a new one.
+        """
+        self.flush()
+        self.window = value
+        self.start = self._window_start()
+
+    @traced("aggregate.flush")
+    def flush(self):
+        """
+        Publishes the aggregates of the current window and resets them.
+        """
+        # Before NTP the RTC counts from its reset value
+        synced = time.gmtime(self.start)[0] >= 2021
+        batch = {}
+        for slot, name in enumerate(self.names):
+            count = self.counts[slot]
+            if not count or not synced:
+                self.counts[slot] = 0
+                continue
+            batch[name.decode()] = [round(self.mins[slot], 2), round(self.maxs[slot], 2),
+                                    round(self.sums[slot] / count, 2), count]
+            self.counts[slot] = 0
+            if len(batch) >= AGGREGATE_BATCH:
+                self._publish(batch)
+                batch = {}
+        if batch:
+            self._publish(batch)
+        if synced:
+            self.windows += 1
+
+    def _publish(self, sensors):
+        self.mqtt.publish(self.topic, json.dumps(
+            {"start": self.start + _UNIX_OFFSET, "window": self.window, "sensors": sensors}))
+        self.messages += 1
+
+    def stats(self):
+        """
+        Returns the number of sensors, windows and published messages.
+        """
+        return {"sensors": len(self.names), "windows": self.windows, "messages": self.messages}
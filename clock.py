@@ -0,0 +1,239 @@
+# clock.py
+import time
+from timer import Timer
+from knobs import knobs
+
+try:
+    from secrets import TIMEZONE
+except ImportError:
+    # Central European Time, DST from last Sunday of March to last Sunday of October
+    TIMEZONE = "CET-1CEST,M3.5.0,M10.5.0/3"
+
+MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun",
+          "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+
+def days_from_civil(year, month, day):
+    """
+    Returns the number of days since 1970-01-01 for a proleptic Gregorian date.
+    """
+    year -= month <= 2
+    era = (year if year >= 0 else year - 399) // 400
+    yoe = year - era * 400
+    doy = (153 * (month + (-3 if month > 2 else 9)) + 2) // 5 + day - 1
+    doe = yoe * 365 + yoe // 4 - yoe // 100 + doy
+    return era * 146097 + doe - 719468
+
+
+# Days between 1970-01-01 and the epoch of time.time() (2000-01-01 on most ports)
+_EPOCH_DAYS = days_from_civil(*time.gmtime(0)[:3])
+
+# Transitions used by a DST name without rules, as in glibc ("EST5EDT")
+_DEFAULT_DST_RULE = "M3.2.0,M11.1.0"
+
+_DAYS_IN_MONTH = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+
+def _parse_offset(text, i):
+    # [+-]hh[:mm[:ss]] -> (seconds, next index)
+    sign = 1
+    if i < len(text) and text[i] in "+-":
+        sign = -1 if text[i] == "-" else 1
+        i += 1
+    parts = [0, 0, 0]
+    part = 0
+    start = i
+    while i < len(text) and (text[i].isdigit() or text[i] == ":"):
+        if text[i] == ":":
+            part += 1
+        else:
+            parts[part] = parts[part] * 10 + int(text[i])
+        i += 1
+    if i == start:
+        raise ValueError("Missing offset in TZ rule")
+    return sign * (parts[0] * 3600 + parts[1] * 60 + parts[2]), i
+
+
+def _parse_name(text, i):
+    if i < len(text) and text[i] == "<":
+        end = text.index(">", i)
+        return text[i + 1:end], end + 1
+    start = i
+    while i < len(text) and text[i].isalpha():
+        i += 1
+    return text[start:i], i
+
+
+def _parse_date(text):
+    # Mm.w.d[/time] -> (month, week, weekday, seconds after local midnight)
+    if not text.startswith("M"):
+        raise ValueError("Only Mm.w.d TZ dates are supported")
+    date, _, at = text[1:].partition("/")
+    month, week, weekday = [int(p) for p in date.split(".")]
+    seconds = _parse_offset(at, 0)[0] if at else 7200
+    return month, week, weekday, seconds
+
+
+class TimeZone:
+    """
+    A time zone described by a POSIX TZ rule, e.g. "CET-1CEST,M3.5.0,M10.5.0/3".
+
+    The two DST transitions of a year are computed once and cached, so the
+    per-call cost of offset() is two comparisons.
+    """
+
+    def __init__(self, rule=TIMEZONE):
+        """
+        Parses the rule.
+
+        Args:
+            rule: POSIX TZ string. Offsets are west-positive as in POSIX,
+                  so "CET-1" means UTC+1.
+        """
+        self.rule = rule
+        std, dst_part = rule, ""
+        if "," in rule:
+            std, dst_part = rule.split(",", 1)
+
+        self.std_name, i = _parse_name(std, 0)
+        offset, i = _parse_offset(std, i)
+        self.std_offset = -offset
+        self.dst_name, i = _parse_name(std, i)
+        self.dst_offset = self.std_offset + 3600
+        if i < len(std):
+            self.dst_offset = -_parse_offset(std, i)[0]
+
+        self.start = self.end = None
+        if self.dst_name:
+            parts = (dst_part or _DEFAULT_DST_RULE).split(",")
+            if len(parts) != 2:
+                raise ValueError(f"Expected start and end of DST in TZ rule {rule!r}")
+            start, end = parts
+            self.start = _parse_date(start)
+            self.end = _parse_date(end)
+
+        self.year = None
+        self.dst_start = self.dst_end = 0
+        # Range of UTC seconds covered by the cached year
+        self.year_start = self.year_end = 0
+
+    def _transition(self, year, rule, offset):
+        # UTC seconds (time.time() epoch) of a Mm.w.d rule in the given year
+        month, week, weekday, seconds = rule
+        first = days_from_civil(year, month, 1)
+        # POSIX weekday: 0 = Sunday; 1970-01-01 was a Thursday (4)
+        day = first + (weekday - (first + 4)) % 7 + (week - 1) * 7
+        last = _DAYS_IN_MONTH[month - 1]
+        if month == 2 and year % 4 == 0 and (year % 100 != 0 or year % 400 == 0):
+            last = 29
+        while day - first >= last:
+            day -= 7
+        return (day - _EPOCH_DAYS) * 86400 + seconds - offset
+
+    def transitions(self, year):
+        """
+        Returns the (dst_start, dst_end) UTC timestamps of a year.
+        """
+        return (
+            self._transition(year, self.start, self.std_offset),
+            self._transition(year, self.end, self.dst_offset),
+        )
+
+    def offset(self, utc):
+        """
+        Returns the UTC offset in seconds at a UTC timestamp.
+        """
+        if self.start is None:
+            return self.std_offset
+        if not self.year_start <= utc < self.year_end:
+            self.year = time.gmtime(utc)[0]
+            self.dst_start, self.dst_end = self.transitions(self.year)
+            self.year_start = (days_from_civil(self.year, 1, 1) - _EPOCH_DAYS) * 86400
+            self.year_end = (days_from_civil(self.year + 1, 1, 1) - _EPOCH_DAYS) * 86400
+        if self.dst_start < self.dst_end:
+            dst = self.dst_start <= utc < self.dst_end
+        else:
+            # Southern hemisphere, DST spans the new year
+            dst = utc >= self.dst_start or utc < self.dst_end
+        return self.dst_offset if dst else self.std_offset
+
+    def localtime(self, utc=None):
+        """
+        Returns time.gmtime()-style local time for a UTC timestamp.
+        """
+        if utc is None:
+            utc = int(time.time())
+        return time.gmtime(utc + self.offset(utc))
+
+
+PERIOD = knobs.define("clock.period_ms", 1000, 100, 10000)
+
+
+class Clock:
+    """
+    Publishes the local time to the store once per second.
+
+    The RTC stays in UTC. Each field is only formatted when it changes:
+    "clock.time" every second and "clock.date" once per local day.
+    "clock.utc" carries the UTC timestamp of the tick.
+    """
+
+    def __init__(self, store, tz=None, period=None):
+        """
+        Initializes the Clock.
+
+        Args:
+            store: The Store receiving the clock values.
+            tz: The TimeZone to display (default: TIMEZONE from secrets.py).
+            period: Tick period in ms (default: the "clock.period_ms" knob).
+        """
+        self.store = store
+        self.tz = tz or TimeZone()
+        self.last_utc = None
+        self.minute = None
+        self.minute_text = ""
+        self.day = None
+        self.tick()
+        if period is None:
+            period = PERIOD.value
+            knobs.watch(PERIOD.name, self.set_period)
+        self.period = period
+        self.timer = Timer(self.tick, period)
+
+    def set_period(self, name, period):
+        """
+        Changes the tick period (knob watcher).
+        """
+        self.period = period
+        self.timer.set_period(period)
+
+    def next_tick_ms(self):
+        """
+        Returns the ms until the next tick is due.
+        """
+        return max(0, self.period - time.ticks_diff(time.ticks_ms(), self.ticked))
+
+    def tick(self, timer=None):
+        """
+        Publishes the fields that changed since the last tick.
+        """
+        self.ticked = time.ticks_ms()
+        utc = int(time.time())
+        if utc == self.last_utc:
+            return
+        self.last_utc = utc
+        local = utc + self.tz.offset(utc)
+
+        day = local // 86400
+        if day != self.day:
+            self.day = day
+            t = time.gmtime(local)
+            self.store.set("clock.date", "{:02d} {} {}".format(t[2], MONTHS[t[1] - 1], t[0]))
+
+        seconds = local % 86400
+        minute = seconds // 60
+        if minute != self.minute:
+            self.minute = minute
+            self.minute_text = "{:02d}:{:02d}:".format(minute // 60, minute % 60)
+        self.store.set("clock.time", "{}{:02d}".format(self.minute_text, seconds % 60))
+        self.store.set("clock.utc", utc)
@@ -5,6 +5,9 @@ import lcd_bus
 import machine
 from micropython import const
 import task_handler
+import fonts
+from tracer import traced
+from knobs import knobs
 
 # IMPORTANT: All values must be integers, not strings!
 _WIDTH = const(240)
@@ -22,57 +25,84 @@ DC = 9
 RST = 14
 
 _FREQ = const(40_000_000)
+# The bus is created once, so a new frequency applies after a reboot
+SPI_FREQ = knobs.define("display.spi_freq", _FREQ, 1_000_000, 80_000_000, reboot=True)
 
-print("Initializing LVGL...")
-# Check if LVGL is already initialized
-if not lv.is_initialized():
-    lv.init()
-
-print("Creating SPI bus...")
-spi_bus = machine.SPI.Bus(
-    host=int(SPI_HOST),      # Ensure it is an int
-    mosi=int(MOSI),          # Ensure it is an int
-    miso=int(MISO),          # Ensure it is an int
-    sck=int(SCK),            # Ensure it is an int
-)
-
-print("Creating display bus...")
-display_bus = lcd_bus.SPIBus(
-    spi_bus=spi_bus,
-    freq=int(_FREQ),         # Ensure it is an int
-    dc=int(DC),              # Ensure it is an int
-    cs=int(CS),              # Ensure it is an int
-)
-
-print("Creating display driver...")
-display_driver = st7789.ST7789(
-    data_bus=display_bus,
-    display_width=int(_WIDTH),
-    display_height=int(_HEIGHT),
-    reset_pin=int(RST),           # DIRECTLY as an integer, not as a Pin object!
-    reset_state=st7789.STATE_LOW,
-    backlight_pin=None,           # Also None instead of Pin object
-    color_space=lv.COLOR_FORMAT.RGB565,
-    color_byte_order=st7789.BYTE_ORDER_BGR,
-    rgb565_byte_swap=True,
-)
-
-print("Initializing display...")
-display_driver.init()
-display_driver.set_backlight(100)
-
-print("Setting up LVGL display...")
-# CRITICAL: LVGL needs to know where to render!
-# Create an LVGL Display object linked to the driver
-disp = lv.display_get_default()
-if disp is None:
-    print("ERROR: No default LVGL display found!")
-else:
-    print(f"LVGL display found: {disp}")
-
-print("Creating task handler...")
-th = task_handler.TaskHandler()
-print("Task handler created and running automatically!")
+spi_bus = None
+display_bus = None
+display_driver = None
+th = None
+
+
+def init():
+    """
+    Initializes LVGL, the SPI bus, the ST7789 driver and the task handler.
+
+    Nothing happens on import; the boot sequence calls this first so a splash
+    screen can be shown during network bring-up. Repeated calls are no-ops.
+    """
+    global spi_bus, display_bus, display_driver, th
+    if th is not None:
+        return
+
+    print("Initializing LVGL...")
+    # Check if LVGL is already initialized
+    if not lv.is_initialized():
+        lv.init()
+
+    print("Creating SPI bus...")
+    spi_bus = machine.SPI.Bus(
+        host=int(SPI_HOST),      # Ensure it is an int
+        mosi=int(MOSI),          # Ensure it is an int
+        miso=int(MISO),          # Ensure it is an int
+        sck=int(SCK),            # Ensure it is an int
+    )
+
+    print("Creating display bus...")
+    display_bus = lcd_bus.SPIBus(
+        spi_bus=spi_bus,
+        freq=int(SPI_FREQ.value),  # Ensure it is an int
+        dc=int(DC),              # Ensure it is an int
+        cs=int(CS),              # Ensure it is an int
+    )
+
+    print("Creating display driver...")
+    display_driver = st7789.ST7789(
+        data_bus=display_bus,
+        display_width=int(_WIDTH),
+        display_height=int(_HEIGHT),
+        reset_pin=int(RST),           # DIRECTLY as an integer, not as a Pin object!
+        reset_state=st7789.STATE_LOW,
+        backlight_pin=None,           # Also None instead of Pin object
+        color_space=lv.COLOR_FORMAT.RGB565,
+        color_byte_order=st7789.BYTE_ORDER_BGR,
+        rgb565_byte_swap=True,
+    )
+
+    print("Initializing display...")
+    display_driver.init()
+    display_driver.set_backlight(100)
+
+    print("Setting up LVGL display...")
+    # CRITICAL: LVGL needs to know where to render!
+    # Create an LVGL Display object linked to the driver
+    disp = lv.display_get_default()
+    if disp is None:
+        print("ERROR: No default LVGL display found!")
+    else:
+        print(f"LVGL display found: {disp}")
+
+    print("Creating task handler...")
+    th = task_handler.TaskHandler()
+    print("Task handler created and running automatically!")
+
+
+def set_backlight(level):
+    """
+    Sets the backlight brightness in percent.
+    """
+    if display_driver is not None:
+        display_driver.set_backlight(level)
 
 
 class Display:
@@ -84,6 +114,7 @@ class Display:
         """
         Initializes the Display manager.
         """
+        init()
         self.screens = {}
         self.current_screen = None
         print("Display manager initialized")
@@ -93,8 +124,10 @@ class Display:
         Adds a screen to the manager.
         """
         self.screens[name] = screen_instance
+        fonts.apply(screen_instance.get_screen())
         print(f"Screen '{name}' added")
 
+    @traced("display.show_screen")
     def show_screen(self, name):
         """
         Shows the specified screen.
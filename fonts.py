@@ -0,0 +1,106 @@
+# fonts.py
+import gc
+import os
+import time
+import lvgl as lv
+from knobs import knobs
+
+# Subset font built by scripts/build_font.py: ASCII plus the German
+# umlauts, ß and the degree sign, same size as the stock Montserrat 14
+FONT_FILE = "fonts/ui_14.bin"
+# Read the file in one go and let LVGL parse it from memory, instead of
+# many small file system reads through the "S:" driver. Either way LVGL
+# copies the glyphs into its own allocations, which live on the
+# MicroPython heap, i.e. in PSRAM on boards with SPIRAM.
+FONT_PRELOAD = knobs.define("font.preload", True, reboot=True)
+
+# Used when the subset font is missing, the stock font has ASCII only
+_ASCII = (
+    ("ä", "ae"), ("Ä", "Ae"),
+    ("ö", "oe"), ("Ö", "Oe"),
+    ("ü", "ue"), ("Ü", "Ue"),
+    ("ß", "ss"),
+    ("°", " "),
+)
+
+# The loaded font, None while the stock font is used
+font = None
+_fs_driver = None
+
+
+def _file_size(path):
+    try:
+        return os.stat(path)[6]
+    except OSError:
+        return 0
+
+
+def _register_fs():
+    """
+    Registers the LVGL "S:" file system driver once.
+    """
+    global _fs_driver
+    if _fs_driver is None:
+        import fs_driver
+        _fs_driver = lv.fs_drv_t()
+        fs_driver.fs_register(_fs_driver, "S")
+
+
+def load(path=FONT_FILE):
+    """
+    Loads the subset font; call after LVGL is initialized.
+
+    On any error the stock font stays in use and text() falls back to
+    ASCII.
+
+    Returns:
+        The LVGL font, or None.
+    """
+    global font
+    if font is not None:
+        return font
+    size = _file_size(path)
+    if not size:
+        print(f"Font {path} not found, using the stock font")
+        return None
+    gc.collect()
+    free = gc.mem_free()
+    start = time.ticks_ms()
+    try:
+        if FONT_PRELOAD.value and hasattr(lv, "binfont_create_from_buffer"):
+            with open(path, "rb") as f:
+                data = f.read()
+            font = lv.binfont_create_from_buffer(data, size)
+            data = None
+        else:
+            _register_fs()
+            font = lv.binfont_create("S:" + path)
+    except (OSError, MemoryError, ImportError) as e:
+        print(f"Error loading font {path}: {e}")
+        font = None
+    if font is None:
+        return None
+    gc.collect()
+    print(f"Font {path}: {size} bytes, loaded in {time.ticks_diff(time.ticks_ms(), start)} ms, "
+          f"{free - gc.mem_free()} bytes of RAM")
+    return font
+
+
+def apply(obj):
+    """
+    Sets the loaded font on a screen; its children inherit it.
+    """
+    if font is not None:
+        obj.set_style_text_font(font, 0)
+
+
+def text(s):
+    """
+    Returns s unchanged if the subset font is loaded, otherwise with the
+    characters the stock font lacks replaced by ASCII.
+    """
+    if font is not None or not s:
+        return s
+    for char, replacement in _ASCII:
+        s = s.replace(char, replacement)
+    return s
@@ -0,0 +1,250 @@
+# forecast.py
+from array import array
+
+# The 5 day / 3 hour forecast of OpenWeatherMap has 40 entries
+FORECAST_SLOTS = 40
+FORECAST_DAYS = 6
+# Bytes per slot: stamp (4), temperature (2), icon (1), precipitation (1)
+SLOT_BYTES = 8
+
+
+def encode_icon(code):
+    """
+    Packs an OpenWeatherMap icon code ("10d") into one byte.
+    """
+    return int(code[:2]) * 2 + (1 if code[2:3] == "n" else 0)
+
+
+def decode_icon(value):
+    """
+    Unpacks a byte from encode_icon() into the icon code.
+    """
+    return "{:02d}{}".format(value >> 1, "n" if value & 1 else "d")
+
+
+class Forecast:
+    """
+    A compact forecast: parallel arrays instead of a dict per entry.
+
+    Temperatures are stored in tenths of a degree, precipitation
+    probabilities in percent, icons packed by encode_icon(). The daily
+    summary (min/max, icon around noon) is derived from the same slots, so
+    one request serves both the hourly and the daily view.
+    """
+
+    def __init__(self, slots=FORECAST_SLOTS, days=FORECAST_DAYS):
+        """
+        Initializes the Forecast.
+
+        Args:
+            slots: Number of 3-hour slots kept.
+            days: Number of days summarized.
+        """
+        self.capacity = slots
+        self.stamps = array('I', bytearray(4 * slots))  # Unix time
+        self.temps = array('h', bytearray(2 * slots))
+        self.icons = bytearray(slots)
+        self.pops = bytearray(slots)
+        self.count = 0
+
+        self.max_days = days
+        self.day_stamps = array('I', bytearray(4 * days))
+        self.day_min = array('h', bytearray(2 * days))
+        self.day_max = array('h', bytearray(2 * days))
+        self.day_icons = bytearray(days)
+        self.day_pops = bytearray(days)
+        self.days = 0
+
+        self.utc_offset = 0  # Seconds, from the "city" section
+        self.revision = 0
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        """
+        Forgets all slots; the arrays are kept.
+        """
+        self.count = 0
+        self.days = 0
+
+    def add(self, stamp, temp, icon, pop):
+        """
+        Appends a slot. Slots beyond the capacity are ignored.
+
+        Args:
+            stamp: Unix time of the slot.
+            temp: Temperature in degrees.
+            icon: Icon code, e.g. "10d".
+            pop: Probability of precipitation, 0..1.
+        """
+        if self.count >= self.capacity:
+            return
+        i = self.count
+        self.stamps[i] = stamp
+        self.temps[i] = int(round(temp * 10))
+        self.icons[i] = encode_icon(icon) if icon else 0
+        self.pops[i] = int(pop * 100 + 0.5)
+        self.count += 1
+
+    def summarize(self):
+        """
+        Derives the daily summary from the slots in local time and bumps
+        the revision.
+        """
+        self.days = 0
+        day = None
+        best_hour = 0
+        for i in range(self.count):
+            local = self.stamps[i] + self.utc_offset
+            if local // 86400 != day:
+                if self.days >= self.max_days:
+                    break
+                day = local // 86400
+                d = self.days
+                self.days += 1
+                self.day_stamps[d] = self.stamps[i]
+                self.day_min[d] = self.temps[i]
+                self.day_max[d] = self.temps[i]
+                self.day_icons[d] = self.icons[i]
+                self.day_pops[d] = self.pops[i]
+                best_hour = 99
+            d = self.days - 1
+            self.day_min[d] = min(self.day_min[d], self.temps[i])
+            self.day_max[d] = max(self.day_max[d], self.temps[i])
+            self.day_pops[d] = max(self.day_pops[d], self.pops[i])
+            # The icon of the slot closest to noon represents the day
+            hour = abs(local % 86400 // 3600 - 12)
+            if hour < best_hour:
+                best_hour = hour
+                self.day_icons[d] = self.icons[i]
+        self.revision += 1
+
+    def icon(self, i):
+        """
+        Returns the icon code of slot i.
+        """
+        return decode_icon(self.icons[i])
+
+    def memory_bytes(self):
+        """
+        Returns the bytes held by the slot and day arrays.
+        """
+        return self.capacity * SLOT_BYTES + self.max_days * 10
+
+
+# Bytes allowed between a key's colon and its value
+_WHITESPACE = (b" ", b"\n", b"\r", b"\t")
+
+
+class ForecastParser:
+    """
+    Stream parser for the OpenWeatherMap forecast response.
+
+    Instead of building the JSON tree (tens of KB for 40 entries) the
+    parser scans each chunk for the few keys it needs, "dt", "temp",
+    "icon", "pop" and "timezone", and writes them straight into a
+    Forecast. Only a short tail of a chunk is kept when a key or value
+    continues in the next one.
+    """
+
+    # Longest kept tail without a pending value: '"timezone"' plus margin
+    TAIL = 16
+
+    def __init__(self, forecast):
+        """
+        Initializes the ForecastParser.
+
+        Args:
+            forecast: The Forecast receiving the slots.
+        """
+        self.forecast = forecast
+        self.reset()
+
+    def reset(self):
+        """
+        Prepares a new response.
+        """
+        self.forecast.clear()
+        self.tail = b""
+        self.stamp = None
+        self.temp = 0.0
+        self.icon = None
+        self.pop = 0.0
+
+    def _commit(self):
+        if self.stamp is not None:
+            self.forecast.add(self.stamp, self.temp, self.icon, self.pop)
+        self.stamp = None
+        self.temp = 0.0
+        self.icon = None
+        self.pop = 0.0
+
+    def _value(self, key, value):
+        if key == b"dt":
+            # "dt" opens the next list entry
+            self._commit()
+            self.stamp = int(value)
+        elif key == b"temp":
+            self.temp = float(value)
+        elif key == b"icon":
+            if self.icon is None:
+                self.icon = value
+        elif key == b"pop":
+            self.pop = float(value)
+        elif key == b"timezone":
+            self.forecast.utc_offset = int(value)
+
+    def feed(self, chunk):
+        """
+        Parses the next chunk of the response body.
+        """
+        data = self.tail + bytes(chunk) if self.tail else bytes(chunk)
+        pos = 0
+        while True:
+            colon = data.find(b'":', pos)
+            if colon < 0:
+                break
+            start = data.rfind(b'"', pos, colon)
+            key = data[start + 1:colon]
+            if key not in (b"dt", b"temp", b"icon", b"pop", b"timezone"):
+                pos = colon + 2
+                continue
+            begin = colon + 2
+            # Pretty-printed JSON has whitespace after the colon
+            while data[begin:begin + 1] in _WHITESPACE:
+                begin += 1
+            if begin >= len(data):
+                # Value starts in the next chunk
+                self.tail = data[start:]
+                return
+            if data[begin:begin + 1] == b'"':
+                end = data.find(b'"', begin + 1)
+                value_end = end + 1
+                begin += 1
+            else:
+                end = -1
+                for delimiter in (b",", b"}", b"]"):
+                    found = data.find(delimiter, begin)
+                    if found >= 0 and (end < 0 or found < end):
+                        end = found
+                value_end = end
+            if end < 0:
+                # Value continues in the next chunk
+                self.tail = data[start:]
+                return
+            self._value(key, data[begin:end].strip().decode())
+            pos = value_end
+        self.tail = data[max(pos, len(data) - self.TAIL):]
+
+    def finish(self):
+        """
+        Completes the response and summarizes the days.
+
+        Returns:
+            int: Number of slots parsed.
+        """
+        self._commit()
+        self.tail = b""
+        self.forecast.summarize()
+        return self.forecast.count
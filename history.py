@@ -0,0 +1,207 @@
+# history.py
+from array import array
+import time
+
+# Bytes per stored sample: one 'f' value plus one 'I' timestamp
+SAMPLE_BYTES = 8
+
+
+class SensorHistory:
+    """
+    A fixed-capacity ring buffer of (timestamp, value) samples for one sensor.
+
+    Values live in an array('f') and timestamps (seconds, time.time()) in an
+    array('I'), so the buffer never grows and never allocates per sample.
+    """
+
+    def __init__(self, capacity):
+        """
+        Initializes the ring buffer.
+
+        Args:
+            capacity: Maximum number of samples kept.
+        """
+        self.capacity = capacity
+        # bytearray initializers are copied raw on MicroPython and CPython
+        self.values = array("f", bytearray(4 * capacity))
+        self.stamps = array("I", bytearray(4 * capacity))
+        self.head = 0  # Index of the next write
+        self.count = 0
+        self.total = 0  # Samples appended since creation, never wraps back
+        self.last_stamp = 0
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        """
+        Empties the buffer without releasing its storage.
+        """
+        self.head = 0
+        self.count = 0
+        self.total = 0
+        self.last_stamp = 0
+
+    def append(self, value, stamp=None):
+        """
+        Stores a sample, overwriting the oldest one when full.
+        """
+        if stamp is None:
+            stamp = int(time.time())
+        self.values[self.head] = value
+        self.stamps[self.head] = stamp
+        self.head = (self.head + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+        self.total += 1
+        self.last_stamp = stamp
+
+    def _start(self):
+        return (self.head - self.count) % self.capacity
+
+    def latest(self):
+        """
+        Returns the newest (timestamp, value) pair or None if empty.
+        """
+        if not self.count:
+            return None
+        i = (self.head - 1) % self.capacity
+        return self.stamps[i], self.values[i]
+
+    def samples(self):
+        """
+        Yields (timestamp, value) pairs from oldest to newest.
+        """
+        i = self._start()
+        for _ in range(self.count):
+            yield self.stamps[i], self.values[i]
+            i = (i + 1) % self.capacity
+
+    def recent(self, n):
+        """
+        Yields the values of the newest `n` samples from oldest to newest.
+        """
+        n = min(n, self.count)
+        i = (self.head - n) % self.capacity
+        for _ in range(n):
+            yield self.values[i]
+            i = (i + 1) % self.capacity
+
+    def downsample(self, buckets):
+        """
+        Reduces the buffer into at most `buckets` min/max/avg buckets.
+
+        Samples are split into equally sized groups in chronological order.
+
+        Returns:
+            tuple: (mins, maxs, avgs) as array('f'), each of length
+                   min(buckets, len(self)).
+        """
+        n = min(buckets, self.count)
+        mins = array("f", bytearray(4 * n))
+        maxs = array("f", bytearray(4 * n))
+        avgs = array("f", bytearray(4 * n))
+        if not n:
+            return mins, maxs, avgs
+
+        values = self.values
+        cap = self.capacity
+        start = self._start()
+        for b in range(n):
+            lo = b * self.count // n
+            hi = (b + 1) * self.count // n
+            v = values[(start + lo) % cap]
+            b_min = b_max = total = v
+            for k in range(lo + 1, hi):
+                v = values[(start + k) % cap]
+                if v < b_min:
+                    b_min = v
+                elif v > b_max:
+                    b_max = v
+                total += v
+            mins[b] = b_min
+            maxs[b] = b_max
+            avgs[b] = total / (hi - lo)
+        return mins, maxs, avgs
+
+
+class HistoryStore:
+    """
+    Owns the history buffers of all sensors within a fixed memory budget.
+
+    The budget is split into equally sized buffers. Once every buffer is in
+    use, a new sensor takes over the buffer of the least recently updated one,
+    so memory stays bounded no matter how many sensors publish.
+    """
+
+    def __init__(self, budget_bytes=16384, capacity=120):
+        """
+        Initializes the store.
+
+        Args:
+            budget_bytes: Upper bound for all sample storage.
+            capacity: Samples kept per sensor.
+        """
+        self.capacity = capacity
+        self.max_sensors = max(1, budget_bytes // (capacity * SAMPLE_BYTES))
+        self.histories = {}
+        self.evictions = 0
+
+    def get(self, name):
+        """
+        Returns the history of a sensor or None.
+        """
+        return self.histories.get(name)
+
+    def _acquire(self, name):
+        if len(self.histories) < self.max_sensors:
+            history = SensorHistory(self.capacity)
+        else:
+            oldest = None
+            for key, candidate in self.histories.items():
+                if oldest is None or candidate.last_stamp < self.histories[oldest].last_stamp:
+                    oldest = key
+            history = self.histories.pop(oldest)
+            history.clear()
+            self.evictions += 1
+        self.histories[name] = history
+        return history
+
+    def record(self, name, value, stamp=None):
+        """
+        Appends a sample to the history of `name`, allocating a buffer if needed.
+
+        Returns:
+            SensorHistory: The buffer that received the sample.
+        """
+        history = self.histories.get(name)
+        if history is None:
+            history = self._acquire(name)
+        history.append(value, stamp)
+        return history
+
+    def release(self, keep=()):
+        """
+        Frees the buffers of the least recently updated half of the sensors,
+        except those in keep (memory pressure).
+
+        Returns:
+            int: Number of released buffers.
+        """
+        names = sorted((h.last_stamp, name) for name, h in self.histories.items() if name not in keep)
+        names = names[:(len(names) + 1) // 2]
+        for _, name in names:
+            del self.histories[name]
+        return len(names)
+
+    def names(self):
+        """
+        Returns the names of all tracked sensors.
+        """
+        return list(self.histories)
+
+    def memory_bytes(self):
+        """
+        Returns the sample storage currently allocated.
+        """
+        return len(self.histories) * self.capacity * SAMPLE_BYTES
@@ -0,0 +1,293 @@
+# http_pool.py
+import socket
+import time
+from tls import get_context
+from memory import governor
+
+
+class HttpError(Exception):
+    """
+    Raised for malformed responses or when a body does not fit the buffer.
+    """
+
+
+def parse_url(url):
+    """
+    Splits a URL into (scheme, host, port, path).
+    """
+    scheme, _, rest = url.partition("://")
+    host, slash, path = rest.partition("/")
+    path = slash + path if slash else "/"
+    port = 443 if scheme == "https" else 80
+    if ":" in host:
+        host, port = host.split(":")
+        port = int(port)
+    return scheme, host, port, path
+
+
+class _Connection:
+    def __init__(self, key, sock, stream):
+        self.key = key
+        self.sock = sock
+        self.stream = stream
+        self.requests = 0
+        self.answered = False  # Status line of the current request read
+        self.last_used = time.ticks_ms()
+
+    def close(self):
+        try:
+            self.stream.close()
+        except OSError:
+            pass
+
+
+class HttpConnectionPool:
+    """
+    A small pool of persistent HTTP/1.1 connections.
+
+    Requests to the same scheme/host/port reuse an idle keep-alive
+    connection, so HTTPS pays the TLS handshake once instead of on every
+    refresh. Response bodies are read into a caller-provided buffer.
+
+    Periodic users call keep_idle() with their refresh period, so the
+    connection outlives the wait between two requests. A server that
+    closed it in the meantime costs one failed write and a reconnect,
+    which still resumes the TLS session where the ssl module allows.
+    """
+
+    def __init__(self, max_idle=2, idle_timeout_ms=120000, timeout_s=10):
+        """
+        Initializes the pool.
+
+        Args:
+            max_idle: Idle connections kept open at most.
+            idle_timeout_ms: Idle connections older than this are closed.
+            timeout_s: Socket timeout for connect and reads.
+        """
+        self.max_idle = max_idle
+        self.idle_timeout_ms = idle_timeout_ms
+        self.timeout_s = timeout_s
+        self.idle = []
+        self.addresses = {}
+        self.opened = 0
+        self.reused = 0
+        self.https = False
+
+    def keep_idle(self, ms):
+        """
+        Keeps idle connections for at least ms, e.g. a refresh period.
+        """
+        if ms > self.idle_timeout_ms:
+            self.idle_timeout_ms = ms
+
+    def _open(self, key):
+        scheme, host, port = key
+        address = self.addresses.get((host, port))
+        if address is None:
+            address = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)[0][-1]
+            self.addresses[(host, port)] = address
+        sock = socket.socket()
+        sock.settimeout(self.timeout_s)
+        try:
+            sock.connect(address)
+            stream = sock
+            if scheme == "https":
+                self.https = True
+                stream = get_context().wrap_socket(sock, server_hostname=host)
+        except Exception:
+            sock.close()
+            raise
+        self.opened += 1
+        return _Connection(key, sock, stream)
+
+    def _take(self, key):
+        now = time.ticks_ms()
+        found = None
+        keep = []
+        for conn in self.idle:
+            if time.ticks_diff(now, conn.last_used) >= self.idle_timeout_ms:
+                conn.close()
+            elif found is None and conn.key == key:
+                found = conn
+            else:
+                keep.append(conn)
+        self.idle = keep
+        return found
+
+    def _release(self, conn):
+        conn.last_used = time.ticks_ms()
+        self.idle.append(conn)
+        while len(self.idle) > self.max_idle:
+            self.idle.pop(0).close()
+
+    def _discard(self, conn):
+        if conn.key[0] == "https":
+            get_context().remember(conn.stream, conn.key[1])
+        conn.close()
+
+    def close(self):
+        """
+        Closes all idle connections.
+        """
+        for conn in self.idle:
+            self._discard(conn)
+        self.idle = []
+
+    def stats(self):
+        """
+        Returns connection statistics, with TLS handshakes once https was used.
+        """
+        stats = {
+            "opened": self.opened,
+            "reused": self.reused,
+            "idle": len(self.idle),
+            "idle_timeout_ms": self.idle_timeout_ms,
+        }
+        if self.https:
+            stats["tls"] = get_context().stats()
+        return stats
+
+    def get(self, url, buf):
+        """
+        Performs a GET request and reads the body into `buf`.
+
+        A reused connection that turns out to be closed by the server
+        before it answers is retried once on a fresh connection.
+
+        Returns:
+            tuple: (status, memoryview of the body within buf)
+        """
+        return self._get(url, buf, None)
+
+    def stream(self, url, sink, buf):
+        """
+        Performs a GET request and passes the body to sink(memoryview) in
+        pieces of at most len(buf) bytes, for bodies larger than any buffer.
+
+        Returns:
+            int: The HTTP status.
+        """
+        return self._get(url, buf, sink)[0]
+
+    def _get(self, url, buf, sink):
+        scheme, host, port, path = parse_url(url)
+        key = (scheme, host, port)
+        request = (
+            f"GET {path} HTTP/1.1\r\nHost: {host}\r\n"
+            "Connection: keep-alive\r\nAccept-Encoding: identity\r\n\r\n"
+        ).encode()
+
+        conn = self._take(key)
+        if conn is not None:
+            self.reused += 1
+            try:
+                return self._request(conn, request, buf, sink)
+            except (OSError, HttpError):
+                self._discard(conn)
+                # Once the status line is in, the sink may have part of the
+                # body, so only a connection that never answered is retried
+                if conn.answered:
+                    raise
+                # Stale keep-alive connection, fall through to a new one
+        conn = self._open(key)
+        try:
+            return self._request(conn, request, buf, sink)
+        except Exception:
+            self._discard(conn)
+            raise
+
+    def _readline(self, stream):
+        line = stream.readline()
+        if not line:
+            raise HttpError("Connection closed")
+        return line
+
+    def _request(self, conn, request, buf, sink):
+        stream = conn.stream
+        conn.answered = False
+        stream.write(request)
+        conn.requests += 1
+
+        status_line = self._readline(stream).split(None, 2)
+        if len(status_line) < 2:
+            raise HttpError("Malformed status line")
+        status = int(status_line[1])
+        conn.answered = True
+
+        length = None
+        chunked = False
+        keep_alive = status_line[0] == b"HTTP/1.1"
+        while True:
+            line = self._readline(stream)
+            if line == b"\r\n":
+                break
+            name, _, value = line.partition(b":")
+            name = name.strip().lower()
+            value = value.strip().lower()
+            if name == b"content-length":
+                length = int(value)
+            elif name == b"transfer-encoding" and value == b"chunked":
+                chunked = True
+            elif name == b"connection":
+                keep_alive = value == b"keep-alive"
+
+        view = memoryview(buf)
+        if chunked:
+            size = 0
+            while True:
+                chunk = int(self._readline(stream).split(b";")[0], 16)
+                if chunk == 0:
+                    self._readline(stream)  # Final CRLF, trailers are not used
+                    break
+                size = self._read_body(stream, view, size, chunk, sink)
+                self._readline(stream)
+        elif length is not None:
+            size = self._read_body(stream, view, 0, length, sink)
+        else:
+            # Body ends when the server closes the connection
+            keep_alive = False
+            size = 0
+            while True:
+                if size >= len(buf):
+                    raise HttpError("Response larger than buffer")
+                n = stream.readinto(view[size:])
+                if not n:
+                    break
+                if sink is None:
+                    size += n
+                else:
+                    sink(view[:n])
+
+        if keep_alive:
+            self._release(conn)
+        else:
+            self._discard(conn)
+        return status, view[:size]
+
+    def _read_body(self, stream, view, offset, count, sink):
+        if sink is None:
+            self._read_exact(stream, view, offset, count)
+            return offset + count
+        # Streaming: reuse the whole buffer for every piece
+        while count:
+            n = min(count, len(view))
+            self._read_exact(stream, view, 0, n)
+            sink(view[:n])
+            count -= n
+        return 0
+
+    def _read_exact(self, stream, view, offset, count):
+        if offset + count > len(view):
+            raise HttpError("Response larger than buffer")
+        end = offset + count
+        while offset < end:
+            n = stream.readinto(view[offset:end])
+            if not n:
+                raise HttpError("Connection closed")
+            offset += n
+
+
+# Shared pool, e.g. for all weather requests
+pool = HttpConnectionPool()
+# An idle TLS connection holds tens of KB of mbedTLS buffers
+governor.on_pressure(pool.close)
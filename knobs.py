@@ -0,0 +1,239 @@
+# knobs.py
+import json
+
+try:
+    from secrets import CONFIG_TOPIC
+except ImportError:
+    CONFIG_TOPIC = "Config"
+
+KNOBS_FILE = "knobs.json"
+_INF = float("inf")
+
+
+class WatcherError(Exception):
+    """
+    Raised by Knobs.set() when the value was applied but a watcher failed.
+    """
+
+
+class Knob:
+    """
+    A typed, range-checked tunable. Hot code reads `knob.value` directly.
+    """
+
+    def __init__(self, name, default, minimum=None, maximum=None, choices=None, reboot=False):
+        self.name = name
+        self.kind = type(default)
+        self.default = default
+        self.value = default
+        self.minimum = minimum
+        self.maximum = maximum
+        self.choices = choices
+        self.reboot = reboot
+        self.watchers = []
+
+    def validate(self, value):
+        """
+        Returns value converted to the knob's type; raises ValueError if it
+        is out of range or not convertible.
+        """
+        if self.kind is bool:
+            if not isinstance(value, bool):
+                raise ValueError("expected true or false")
+        elif self.kind in (int, float):
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValueError("expected a number")
+            # NaN and infinity pass no range check and break int()
+            if value != value or value in (_INF, -_INF):
+                raise ValueError("expected a finite number")
+            if self.kind is int and value != int(value):
+                raise ValueError("expected an integer")
+            value = self.kind(value)
+            if self.minimum is not None and value < self.minimum:
+                raise ValueError(f"below minimum {self.minimum}")
+            if self.maximum is not None and value > self.maximum:
+                raise ValueError(f"above maximum {self.maximum}")
+        else:
+            value = str(value)
+        if self.choices is not None and value not in self.choices:
+            raise ValueError(f"not one of {self.choices}")
+        return value
+
+
+class Knobs:
+    """
+    Registry of runtime tunables.
+
+    Modules define their knobs at import time and read `knob.value`; code
+    that must act on a change (re-arming a timer, changing a period)
+    registers a watcher. Values differing from the defaults are persisted
+    to a JSON file and applied when the knob is defined on the next boot.
+    Knobs marked `reboot` are only persisted; they take effect after a
+    restart.
+    """
+
+    def __init__(self, path=KNOBS_FILE):
+        """
+        Initializes the registry and reads the persisted values.
+
+        Args:
+            path: The config file.
+        """
+        self.path = path
+        self.knobs = {}
+        try:
+            with open(path) as f:
+                self.stored = json.load(f)
+        except (OSError, ValueError):
+            self.stored = {}
+
+    def define(self, name, default, minimum=None, maximum=None, choices=None, reboot=False):
+        """
+        Defines a knob (or returns the existing one) and applies its
+        persisted value.
+
+        Returns:
+            Knob: The knob.
+        """
+        knob = self.knobs.get(name)
+        if knob is not None:
+            return knob
+        knob = Knob(name, default, minimum, maximum, choices, reboot)
+        if name in self.stored:
+            try:
+                knob.value = knob.validate(self.stored[name])
+            except ValueError as e:
+                print(f"Ignoring stored knob {name}: {e}")
+        self.knobs[name] = knob
+        return knob
+
+    def watch(self, name, callback):
+        """
+        Registers callback(name, value) for live changes of a knob.
+        """
+        self.knobs[name].watchers.append(callback)
+
+    def set(self, name, value):
+        """
+        Validates and applies a new value.
+
+        Returns:
+            The applied value.
+
+        Raises:
+            KeyError: Unknown knob.
+            ValueError: Invalid value.
+            WatcherError: Applied, but a watcher failed; every watcher
+                still ran.
+        """
+        knob = self.knobs[name]
+        value = knob.validate(value)
+        if value != knob.value:
+            knob.value = value
+            if not knob.reboot:
+                errors = []
+                for callback in knob.watchers:
+                    try:
+                        callback(name, value)
+                    except Exception as e:
+                        print(f"Knob watcher error for '{name}': {e}")
+                        errors.append(str(e))
+                if errors:
+                    raise WatcherError("; ".join(errors))
+        return value
+
+    def values(self):
+        """
+        Returns all current values by name.
+        """
+        return {name: knob.value for name, knob in self.knobs.items()}
+
+    def save(self):
+        """
+        Persists the values that differ from their defaults.
+        """
+        changed = {name: knob.value for name, knob in self.knobs.items() if knob.value != knob.default}
+        # Keep values of knobs not defined in this build
+        for name, value in self.stored.items():
+            if name not in self.knobs:
+                changed[name] = value
+        try:
+            with open(self.path, "w") as f:
+                json.dump(changed, f)
+            self.stored = changed
+        except OSError as e:
+            print(f"Error saving knobs: {e}")
+
+
+class ConfigChannel:
+    """
+    Applies knob updates received over MQTT and acknowledges them.
+
+    A JSON object of {knob name: value} on "<CONFIG_TOPIC>/set" (all
+    units) or "<CONFIG_TOPIC>/<client id>/set" (one unit) is validated
+    knob by knob. Valid values are applied and persisted at once. The
+    answer on "<CONFIG_TOPIC>/<client id>/ack" lists the applied values,
+    the rejected ones with the reason, the applied ones whose watcher
+    failed and the knobs that need a reboot. An empty object just reports
+    all current values.
+    """
+
+    def __init__(self, mqtt, knobs, topic=CONFIG_TOPIC):
+        """
+        Initializes the ConfigChannel.
+
+        Args:
+            mqtt: The MQTT client instance for communication.
+            knobs: The Knobs registry.
+            topic: Base topic.
+        """
+        self.mqtt = mqtt
+        self.knobs = knobs
+        client_id = mqtt.client_id.decode() if isinstance(mqtt.client_id, bytes) else mqtt.client_id
+        self.ack_topic = f"{topic}/{client_id}/ack"
+        mqtt.subscribe(f"{topic}/set", self.handle_config)
+        mqtt.subscribe(f"{topic}/{client_id}/set", self.handle_config)
+
+    def handle_config(self, topic, msg):
+        """
+        Validates, applies and acknowledges a config update.
+        """
+        applied = {}
+        rejected = {}
+        failed = {}
+        reboot = []
+        try:
+            update = json.loads(msg)
+            if not isinstance(update, dict):
+                raise ValueError("expected a JSON object")
+        except ValueError as e:
+            rejected["*"] = str(e)
+            update = {}
+        for name, value in update.items():
+            if name not in self.knobs.knobs:
+                rejected[name] = "unknown knob"
+                continue
+            try:
+                applied[name] = self.knobs.set(name, value)
+                if self.knobs.knobs[name].reboot:
+                    reboot.append(name)
+            except WatcherError as e:
+                applied[name] = self.knobs.knobs[name].value
+                failed[name] = str(e)
+            except Exception as e:
+                # Anything a bad value raises must not escape check_msg()
+                rejected[name] = str(e)
+        if applied:
+            self.knobs.save()
+            print(f"Config applied: {applied}")
+        ack = {"applied": applied, "rejected": rejected, "failed": failed, "reboot": reboot}
+        if not update:
+            ack["values"] = self.knobs.values()
+        try:
+            self.mqtt.publish(self.ack_topic, json.dumps(ack))
+        except Exception as e:
+            print(f"Error acknowledging config: {e}")
+
+
+# The shared registry
+knobs = Knobs()
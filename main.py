@@ -1,67 +1,201 @@
 # main.py
+import json
 import time
 import wifi
 import ntp
 from mqtt_client import MQTT
 import display
 import weather
+import weather_source
 import sensors
+import fonts
+from store import Store
+from clock import Clock
 from status_led import StatusLed
+from profiler import BootProfiler
+from splash import SplashScreen
+from memory import governor
+from http_pool import pool
+from scheduler import RefreshScheduler
+from power import PowerManager
+import tracer
+from knobs import knobs, ConfigChannel
 import lvgl as lv
 
+try:
+    from secrets import STATUS_TOPIC
+except ImportError:
+    STATUS_TOPIC = "Status"
+
+# Main loop period and time each screen is shown (ms)
+LOOP_PERIOD = knobs.define("main.loop_ms", 100, 10, 1000)
+SWITCH_INTERVAL = knobs.define("main.switch_ms", 10000, 1000, 3600000)
+# How often the power, MQTT and memory statistics are published (ms)
+STATS_INTERVAL = knobs.define("main.stats_ms", 300000, 10000, 86400000)
+
 
 def main():
     """
     Main function to initialize and run the application.
+
+    Boot order: display and splash first, then Wi-Fi is started in the
+    background while the screens are built, then MQTT, NTP and the first
+    weather fetch. Every stage is recorded by the BootProfiler.
     """
+    profile = BootProfiler()
     led = StatusLed()
 
-    # Connect to Wi-Fi
-    wifi.connect()
+    # Reserve the large hot-path buffers before the heap fragments
+    with profile.stage("memory"):
+        governor.start()
+        governor.preallocate("http", weather_source.HTTP_BUFFER_SIZE)
+        # One icon cache for all screens: an icon per location, one per
+        # forecast cell, plus one being loaded
+        locations = len(weather_source.WEATHER_LOCATIONS)
+        icons = weather.IconCache("icons", locations + 2 * weather.FORECAST_CELLS + 1)
+        governor.preallocate("forecast", weather_source.FORECAST_CHUNK_SIZE)
+
+    # Display first, so the user sees progress during network bring-up
+    with profile.stage("display"):
+        disp = display.Display()
+        # Umlauts and the degree sign; screens get it in add_screen
+        fonts.load()
+        splash = SplashScreen()
+        disp.add_screen("Splash", splash)
+        disp.show_screen("Splash")
+        splash.progress(10, "Connecting Wi-Fi...")
+    profile.mark("first_paint")
+
+    # Start Wi-Fi without waiting for it
+    with profile.stage("wifi_start"):
+        wlan = wifi.WifiManager(led=led)
+        wlan.start()
+
+    # Build the screens while Wi-Fi associates
+    with profile.stage("screens"):
+        # Data sources write into the store, screens only subscribe to it
+        store = Store()
+        clock = Clock(store)
+        mqtt = MQTT()
+        # Live tuning of the knobs over MQTT
+        config = ConfigChannel(mqtt, knobs)
+        # Paces the HTTP requests of all locations within the API quota
+        scheduler = RefreshScheduler()
+        # HTTP polling, the MQTT bridge, or the bridge with HTTP fallback,
+        # one source and one screen per location
+        weather_services = weather_source.create_sources(mqtt, store, scheduler)
+        # Forecast of the first location, one streamed request per refresh
+        forecast_city, forecast_country = weather_source.WEATHER_LOCATIONS[0]
+        forecast_service = weather_source.HttpForecastSource(
+            store, forecast_city, forecast_country, weather_source.location_prefix(0),
+            scheduler=scheduler, key="Forecast")
+        sensor_feed = sensors.SensorFeed(mqtt, store)
+
+        print("=== Initializing Display Screens ===")
+        for name, city, prefix, service in weather_services:
+            disp.add_screen(name, weather.WeatherScreen(store, icons, prefix, city))
+        disp.add_screen("Forecast", weather.ForecastScreen(
+            store, forecast_service.forecast, icons, forecast_service.prefix, forecast_city))
+        # Restores the last sensor readings from flash, before MQTT connects
+        sensor_screen = sensors.SensorScreen(store, sensor_feed)
+        disp.add_screen("Sensors", sensor_screen)
+        splash.progress(40, "Connecting Wi-Fi...")
+
+    def on_first_data(key, value):
+        if key.startswith("weather.") or key == "sensor":
+            profile.mark("first_data")
+            store.unsubscribe(on_first_data)
 
-    # Synchronize time with NTP
-    ntp.sync()
+    store.subscribe_prefix("", on_first_data)
+
+    with profile.stage("wifi_wait"):
+        while not wlan.poll():
+            time.sleep_ms(20)
+        splash.progress(60, "Connecting MQTT...")
+
+    # Synchronize time with NTP in the background (polled in the main loop)
+    ntp_client = ntp.NtpClient()
+    ntp_client.start()
 
     # Start the MQTT client
-    led.mqtt_connecting()
-    mqtt = MQTT()
-    mqtt.connect()
-    led.set_color(255, 255, 0)  # Yellow for connected
-    time.sleep(1)
-    led.off()
+    with profile.stage("mqtt"):
+        led.mqtt_connecting()
+        mqtt.connect()
+        led.set_color(255, 255, 0)  # Yellow for connected
+        splash.progress(80, "Fetching weather...")
+
+    # Screen names, the weather screens first
+    screen_names = [name for name, city, prefix, service in weather_services]
+    screen_names.append("Forecast")
+    screen_names.append("Sensors")
 
-    print("=== Initializing Display Screens ===")
-    # Start the display manager
-    disp = display.Display()
-    disp.add_screen("Weather", weather.WeatherScreen(mqtt))
-    disp.add_screen("Sensors", sensors.SensorScreen(mqtt))
-    disp.show_screen("Weather")
+    with profile.stage("weather"):
+        scheduler.set_visible(screen_names[0])
+        for name, city, prefix, service in weather_services:
+            service.start()
+        forecast_service.start()
+        # The first location is fetched right away, the others staggered
+        scheduler.poll()
+        splash.progress(100, "Ready")
+
+    disp.show_screen(screen_names[0])
+    led.off()
+    profile.end()
+    profile.report()
 
     print("Display initialized and running!")
     print("Hardware timer handles LVGL updates automatically.")
-    print("Screens will switch automatically every 10 seconds.")
+    print(f"Screens will switch automatically every {SWITCH_INTERVAL.value // 1000} seconds.")
     print("Press Ctrl+C to stop\n")
 
-    # Liste der Screens für automatischen Wechsel
-    screen_names = ["Weather", "Sensors"]
+    # Idle mode: lower refresh rate, dimmed backlight, longer waits
+    power = PowerManager(store, display.th, clock, display.set_backlight, mqtt, wlan, scheduler)
+    client_id = mqtt.client_id.decode() if isinstance(mqtt.client_id, bytes) else mqtt.client_id
+    status_topic = f"{STATUS_TOPIC}/{client_id}"
+    last_stats = time.ticks_ms()
+
+    # Automatischer Wechsel über screen_names
     current_screen_index = 0
-    screen_switch_counter = 0
-    SWITCH_INTERVAL = 100  # 100 * 100ms = 10 Sekunden
+    last_switch = time.ticks_ms()
 
     # Main loop - Timer läuft automatisch!
     while True:
-        mqtt.check_msg()
-        time.sleep_ms(100)
+        if wlan.poll():
+            mqtt.check_msg()
+            power.handled()
+        ntp_client.poll()
+        scheduler.poll()
+        # Debounced, so flash is written at most every few minutes
+        sensor_screen.snapshot.poll()
+        # Publishes the sensor rollups once a window has ended
+        sensor_feed.aggregator.poll()
+        # Collect garbage here, between frames, rather than mid-render
+        governor.idle()
+        power.poll()
+        if time.ticks_diff(time.ticks_ms(), last_stats) >= STATS_INTERVAL.value:
+            last_stats = time.ticks_ms()
+            mqtt.publish(status_topic, json.dumps(
+                {"power": power.stats(), "mqtt": mqtt.stats(), "http": pool.stats(),
+                 "memory": governor.stats()}))
+        # Knob values are read every pass, so changes apply immediately.
+        # Returns early when MQTT data arrives.
+        power.wait(LOOP_PERIOD.value)
 
-        # Automatischer Screen-Wechsel
-        screen_switch_counter += 1
-        if screen_switch_counter >= SWITCH_INTERVAL:
-            screen_switch_counter = 0
+        # Automatischer Screen-Wechsel, paused while idle
+        if not power.is_idle() and time.ticks_diff(time.ticks_ms(), last_switch) >= SWITCH_INTERVAL.value:
+            last_switch = time.ticks_ms()
             current_screen_index = (current_screen_index + 1) % len(screen_names)
             next_screen = screen_names[current_screen_index]
             print(f"Switching to {next_screen} screen...")
+            # Shown data that is getting old is refreshed first
+            scheduler.set_visible(next_screen)
             disp.show_screen(next_screen)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    try:
+        main()
+    except BaseException:
+        # Keep the timeline leading up to a fault (or Ctrl+C) on flash
+        tracer.dump()
+        raise
@@ -0,0 +1,146 @@
+# memory.py
+import gc
+import time
+
+# Collect in the next idle window once this much was allocated since the last collection
+IDLE_COLLECT_BYTES = 16384
+# Automatic collection threshold (gc.threshold); keeps collections small and early
+GC_THRESHOLD = 32768
+# Free heap below which the pressure callbacks run
+LOW_WATER_BYTES = 40960
+# Largest free block below which the heap counts as fragmented
+MIN_BLOCK_BYTES = 8192
+# How often the largest free block is probed (ms)
+PROBE_INTERVAL = 30000
+
+
+class MemoryGovernor:
+    """
+    Controls when the garbage collector runs and watches heap fragmentation.
+
+    - gc.threshold() makes automatic collections small and frequent instead
+      of rare and long.
+    - idle() is called from the main loop between frames and collects there,
+      so collections rarely hit weather parsing or rendering.
+    - Large hot-path buffers are preallocated at boot, before the heap
+      fragments, and reused for the lifetime of the program.
+    - When free memory or the largest free block gets too small, registered
+      pressure callbacks drop caches.
+    """
+
+    def __init__(self):
+        self.buffers = {}
+        self.pressure_callbacks = []
+        self.alloc_at_collect = 0
+        self.collections = 0
+        self.collect_us = 0
+        self.max_collect_us = 0
+        self.largest_block = 0
+        self.next_probe = time.ticks_ms()
+        self.pressure_events = 0
+
+    def start(self, threshold=GC_THRESHOLD):
+        """
+        Collects once and sets the automatic collection threshold.
+        """
+        self.collect()
+        gc.threshold(threshold)
+
+    def preallocate(self, name, size):
+        """
+        Allocates a named buffer once; later calls return the same buffer.
+        """
+        buf = self.buffers.get(name)
+        if buf is None or len(buf) < size:
+            buf = bytearray(size)
+            self.buffers[name] = buf
+        return buf
+
+    def buffer(self, name):
+        """
+        Returns a preallocated buffer or None.
+        """
+        return self.buffers.get(name)
+
+    def on_pressure(self, callback):
+        """
+        Registers callback() to release memory (e.g. drop caches) under pressure.
+        """
+        self.pressure_callbacks.append(callback)
+
+    def collect(self):
+        """
+        Runs a collection and records its duration.
+        """
+        start = time.ticks_us()
+        gc.collect()
+        duration = time.ticks_diff(time.ticks_us(), start)
+        self.collections += 1
+        self.collect_us = duration
+        if duration > self.max_collect_us:
+            self.max_collect_us = duration
+        self.alloc_at_collect = gc.mem_alloc()
+
+    def largest_free_block(self, limit=None):
+        """
+        Estimates the largest allocatable block by binary search.
+
+        Each probe is a short-lived bytearray, so the estimate costs about
+        log2(limit / 256) allocations. Run it in idle windows only.
+        """
+        lo, hi = 0, limit or gc.mem_free()
+        while hi - lo > 256:
+            mid = (lo + hi) // 2
+            try:
+                probe = bytearray(mid)
+                del probe
+                lo = mid
+            except MemoryError:
+                hi = mid
+        self.largest_block = lo
+        return lo
+
+    def relieve(self):
+        """
+        Runs the pressure callbacks and collects.
+        """
+        self.pressure_events += 1
+        print(f"Memory pressure: free {gc.mem_free()} B, largest block {self.largest_block} B")
+        for callback in self.pressure_callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Pressure callback error: {e}")
+        self.collect()
+
+    def idle(self):
+        """
+        Uses an idle window in the main loop; call it between frames.
+        """
+        if gc.mem_alloc() - self.alloc_at_collect >= IDLE_COLLECT_BYTES:
+            self.collect()
+        if time.ticks_diff(time.ticks_ms(), self.next_probe) < 0:
+            return
+        self.next_probe = time.ticks_add(time.ticks_ms(), PROBE_INTERVAL)
+        # Blocks of MIN_BLOCK_BYTES * 4 are plenty, no need to probe further
+        block = self.largest_free_block(min(gc.mem_free(), MIN_BLOCK_BYTES * 4))
+        if gc.mem_free() < LOW_WATER_BYTES or block < MIN_BLOCK_BYTES:
+            self.relieve()
+
+    def stats(self):
+        """
+        Returns a dict with heap and collection statistics.
+        """
+        return {
+            "free": gc.mem_free(),
+            "alloc": gc.mem_alloc(),
+            "largest_block": self.largest_block,
+            "collections": self.collections,
+            "collect_us": self.collect_us,
+            "max_collect_us": self.max_collect_us,
+            "pressure_events": self.pressure_events,
+        }
+
+
+# Shared instance, like display.th for the LVGL task handler
+governor = MemoryGovernor()
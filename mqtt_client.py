@@ -1,7 +1,73 @@
 from umqtt.simple import MQTTClient
 from secrets import MQTT_BROKER, MQTT_USER, MQTT_PASSWORD, MQTT_PORT, MQTT_SSL
 import machine
+import time
 import ubinascii
+from tls import get_context
+from tracer import traced
+
+# Pause between reconnect attempts after the connection dropped (ms)
+RECONNECT_INTERVAL = 5000
+
+# Dispatch lanes, higher lanes are dispatched first
+PRIORITY_LOW = 0
+PRIORITY_NORMAL = 1
+PRIORITY_HIGH = 2
+
+# Per check_msg() call: time for reading messages from the socket and for
+# dispatching them to the callbacks (ms), and messages read at most
+READ_BUDGET_MS = 10
+DISPATCH_BUDGET_MS = 15
+READ_MAX = 64
+# Messages queued per lane at most; newer ones are dropped while a lane is full
+LANE_MAX = 64
+# Topics whose rule and token bucket are cached at most
+RULES_MAX = 128
+
+
+class _Limit:
+    def __init__(self, topic_filter, rate, burst, priority):
+        self.topic_filter = topic_filter
+        self.rate = rate
+        self.burst = burst
+        self.priority = priority
+        self.dropped = 0
+        self.coalesced = 0
+
+
+class _Bucket:
+    def __init__(self, limit):
+        self.limit = limit
+        self.tokens = limit.burst
+        self.refilled = time.ticks_ms()
+
+    def take(self, now):
+        limit = self.limit
+        elapsed = time.ticks_diff(now, self.refilled)
+        self.refilled = now
+        self.tokens = min(limit.burst, self.tokens + elapsed * limit.rate / 1000)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+def topic_matches(topic_filter, topic):
+    """
+    Checks whether a topic matches an MQTT topic filter with '+' and '#' wildcards.
+    """
+    if topic_filter == topic:
+        return True
+    filter_levels = topic_filter.split("/")
+    topic_levels = topic.split("/")
+    for i, level in enumerate(filter_levels):
+        if level == "#":
+            return True
+        if i >= len(topic_levels):
+            return False
+        if level != "+" and level != topic_levels[i]:
+            return False
+    return len(filter_levels) == len(topic_levels)
 
 
 class MQTT:
@@ -34,10 +100,27 @@ class MQTT:
             port=self.port,
             user=self.user,
             password=self.password,
-            ssl=self.ssl,
+            # Shared context: CA certificates are loaded once and reconnects
+            # resume the TLS session where the ssl module supports it
+            ssl=get_context() if self.ssl else None,
         )
         self.is_connected = False
         self.subscriptions = {}
+        # (topic filter, callback) run for every received message, before
+        # rate limiting
+        self.taps = []
+        # Ingress: limits per topic filter, a cached rule (and token bucket)
+        # per topic, queued [topic, msg, topic_str, held] items per lane
+        self.limits = []
+        self.rules = {}
+        self.lanes = [[], [], []]
+        self.pending = {}
+        self.overflow = [0, 0, 0]  # Messages dropped per full lane
+        self.received = 0
+        self.dispatched = 0
+        self.connects = 0
+        self.connect_ms = 0
+        self.next_reconnect = None
 
     def connect(self):
         """
@@ -46,15 +129,35 @@ class MQTT:
         if not self.is_connected:
             print(f"Connecting to MQTT broker at {self.broker}...")
             try:
+                start = time.ticks_ms()
+                # The socket and TLS session of a lost connection
+                self._close_socket()
                 self.client.set_callback(self.on_message)
                 self.client.connect()
                 self.is_connected = True
-                print("MQTT connected successfully.")
+                self.connects += 1
+                self.connect_ms = time.ticks_diff(time.ticks_ms(), start)
+                print(f"MQTT connected successfully in {self.connect_ms} ms.")
                 for topic in self.subscriptions:
                     self.client.subscribe(topic)
             except OSError as e:
                 print(f"Failed to connect to MQTT broker: {e}")
+                self._close_socket()
                 self.is_connected = False
+                self.next_reconnect = time.ticks_add(time.ticks_ms(), RECONNECT_INTERVAL)
+
+    def _close_socket(self):
+        """
+        Closes the client's socket, releasing its TLS buffers right away
+        instead of at the next garbage collection.
+        """
+        sock = self.client.sock
+        if sock is not None:
+            try:
+                sock.close()
+            except OSError:
+                pass
+            self.client.sock = None
 
     def disconnect(self):
         """
@@ -65,12 +168,28 @@ class MQTT:
             self.client.disconnect()
             self.is_connected = False
 
+    def _connection_lost(self, e):
+        print(f"MQTT connection lost: {e}")
+        self._close_socket()
+        self.is_connected = False
+        self.next_reconnect = time.ticks_add(time.ticks_ms(), RECONNECT_INTERVAL)
+
     def publish(self, topic, msg):
         """
         Publishes a message to a specific MQTT topic.
+
+        Returns:
+            bool: True if the message was sent; False while disconnected or
+            when the connection broke, which starts the reconnect.
         """
-        if self.is_connected:
+        if not self.is_connected:
+            return False
+        try:
             self.client.publish(topic, msg)
+        except OSError as e:
+            self._connection_lost(e)
+            return False
+        return True
 
     def subscribe(self, topic, callback):
         """
@@ -80,16 +199,203 @@ class MQTT:
         if self.is_connected:
             self.client.subscribe(topic)
 
+    def tap(self, topic_filter, callback):
+        """
+        Registers callback(topic, msg) for every received message matching
+        the filter, before rate limiting and queueing, so it sees the full
+        stream. It runs while the socket is read and must be cheap.
+        """
+        self.taps.append((topic_filter, callback))
+
+    def set_limit(self, topic_filter, rate=None, burst=1, priority=PRIORITY_NORMAL):
+        """
+        Sets the rate limit and priority lane for topics matching a filter.
+
+        With a rate, every matching topic gets its own token bucket and
+        only its latest message is kept while it waits: a newer message
+        replaces a queued one (coalesced) or one held back by the limit
+        (dropped). Topics without a rate are queued in full, in order,
+        up to LANE_MAX per lane. The first matching filter wins.
+
+        Args:
+            topic_filter: Topic filter, may contain + and #.
+            rate: Messages per second per topic, None for no limit.
+            burst: Messages a topic may send at once.
+            priority: PRIORITY_LOW, PRIORITY_NORMAL or PRIORITY_HIGH.
+        """
+        self.limits = [limit for limit in self.limits if limit.topic_filter != topic_filter]
+        self.limits.append(_Limit(topic_filter, rate, burst, priority))
+        self._requeue()
+
+    def _requeue(self):
+        """
+        Moves the queued items to the lanes of the current rules, keeping
+        only the latest item of a topic that is now rate limited.
+        """
+        items = []
+        for lane in self.lanes:
+            items.extend(lane)
+        self.lanes = [[], [], []]
+        self.pending = {}
+        self.rules = {}
+        for item in items:
+            priority, bucket = self._rule(item[2])
+            if bucket is not None:
+                queued = self.pending.get(item[2])
+                if queued is not None:
+                    queued[1] = item[1]
+                    bucket.limit.coalesced += 1
+                    continue
+                self.pending[item[2]] = item
+            self.lanes[priority].append(item)
+
+    def _rule(self, topic):
+        """
+        Returns (priority, bucket or None) of a topic, cached per topic.
+        """
+        rule = self.rules.get(topic)
+        if rule is None:
+            if len(self.rules) >= RULES_MAX:
+                # Forget the topics with nothing queued; they get a new,
+                # full bucket when they publish again
+                self.rules = {t: r for t, r in self.rules.items() if t in self.pending}
+            rule = (PRIORITY_NORMAL, None)
+            for limit in self.limits:
+                if topic_matches(limit.topic_filter, topic):
+                    rule = (limit.priority, _Bucket(limit) if limit.rate else None)
+                    break
+            self.rules[topic] = rule
+        return rule
+
     def on_message(self, topic, msg):
         """
         Callback for incoming messages.
+        Queues the message in its priority lane; dispatch happens in check_msg().
         """
-        if topic in self.subscriptions:
-            self.subscriptions[topic](topic, msg)
+        topic_str = topic.decode() if isinstance(topic, bytes) else topic
+        self.received += 1
+        for topic_filter, callback in self.taps:
+            if topic_matches(topic_filter, topic_str):
+                try:
+                    callback(topic, msg)
+                except Exception as e:
+                    print(f"MQTT tap error for '{topic_str}': {e}")
+        priority, bucket = self._rule(topic_str)
+        lane = self.lanes[priority]
+        if bucket is None:
+            if len(lane) >= LANE_MAX:
+                self.overflow[priority] += 1
+                return
+            lane.append([topic, msg, topic_str, False])
+            return
+        item = self.pending.get(topic_str)
+        if item is not None:
+            # Latest value wins
+            item[1] = msg
+            if item[3]:
+                bucket.limit.dropped += 1
+            else:
+                bucket.limit.coalesced += 1
+            return
+        if len(lane) >= LANE_MAX:
+            bucket.limit.dropped += 1
+            self.overflow[priority] += 1
+            return
+        item = [topic, msg, topic_str, False]
+        self.pending[topic_str] = item
+        lane.append(item)
 
-    def check_msg(self):
+    @traced("mqtt.dispatch")
+    def _dispatch(self, topic, msg, topic_str):
         """
-        Checks for incoming messages.
+        Dispatches to every subscription whose topic filter matches.
         """
-        if self.is_connected:
+        for topic_filter, callback in self.subscriptions.items():
+            if topic_matches(topic_filter, topic_str):
+                try:
+                    callback(topic, msg)
+                except Exception as e:
+                    print(f"MQTT callback error for '{topic_str}': {e}")
+        self.dispatched += 1
+
+    def _read(self):
+        """
+        Reads the messages waiting on the socket into the lanes, within
+        READ_BUDGET_MS, so a flood cannot hold back other topics for long.
+        """
+        start = time.ticks_ms()
+        for _ in range(READ_MAX):
+            received = self.received
             self.client.check_msg()
+            if self.received == received:
+                break
+            if time.ticks_diff(time.ticks_ms(), start) >= READ_BUDGET_MS:
+                break
+
+    def _dispatch_lanes(self):
+        """
+        Dispatches queued messages, highest lane first, within
+        DISPATCH_BUDGET_MS. Rate-limited topics wait for a token.
+
+        An item leaves its lane before its callbacks run, so a failing
+        callback cannot make it or the ones before it dispatch again.
+        """
+        start = time.ticks_ms()
+        for priority in (PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW):
+            lane = self.lanes[priority]
+            i = 0
+            while i < len(lane):
+                now = time.ticks_ms()
+                if time.ticks_diff(now, start) >= DISPATCH_BUDGET_MS:
+                    return
+                item = lane[i]
+                bucket = self._rule(item[2])[1]
+                if bucket is not None:
+                    if not bucket.take(now):
+                        # Held back: replacing it from now on counts as a drop
+                        item[3] = True
+                        i += 1
+                        continue
+                    if self.pending.get(item[2]) is item:
+                        del self.pending[item[2]]
+                del lane[i]
+                self._dispatch(item[0], item[1], item[2])
+                if self.lanes[priority] is not lane:
+                    # A callback changed a limit and the lanes were rebuilt
+                    lane = self.lanes[priority]
+                    i = 0
+
+    @traced("mqtt.check_msg")
+    def check_msg(self):
+        """
+        Reads incoming messages and dispatches them by priority lane.
+        Reconnects after a dropped connection, at most every RECONNECT_INTERVAL ms.
+        """
+        if not self.is_connected:
+            if self.next_reconnect is not None and time.ticks_diff(time.ticks_ms(), self.next_reconnect) >= 0:
+                self.connect()
+        else:
+            try:
+                self._read()
+            except OSError as e:
+                self._connection_lost(e)
+        # Queued messages are dispatched even while reconnecting
+        self._dispatch_lanes()
+
+    def stats(self):
+        """
+        Returns connection, ingress and TLS handshake statistics.
+        """
+        stats = {
+            "connects": self.connects,
+            "connect_ms": self.connect_ms,
+            "received": self.received,
+            "dispatched": self.dispatched,
+            "queued": sum(len(lane) for lane in self.lanes),
+            "overflow": list(self.overflow),
+            "dropped": {limit.topic_filter: limit.dropped for limit in self.limits},
+            "coalesced": {limit.topic_filter: limit.coalesced for limit in self.limits},
+        }
+        if self.ssl:
+            stats["tls"] = get_context().stats()
+        return stats
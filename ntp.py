@@ -1,83 +1,230 @@
-import ntptime
+import socket
+import struct
 import time
-from machine import RTC
 
+try:
+    from secrets import NTP_SERVERS
+except ImportError:
+    NTP_SERVERS = ("pool.ntp.org", "time.google.com", "time.cloudflare.com")
 
-def cettime():
+NTP_PORT = 123
+
+# Seconds between the NTP epoch (1900) and the epoch of time.time()
+NTP_DELTA = 3155673600 if time.gmtime(0)[0] == 2000 else 2208988800
+
+_NS = 1_000_000_000
+
+
+def _ntp_to_ns(data, offset):
+    # 64-bit NTP timestamp (seconds, fraction) -> ns since the time.time() epoch
+    seconds, fraction = struct.unpack_from("!II", data, offset)
+    return (seconds - NTP_DELTA) * _NS + (fraction * _NS >> 32)
+
+
+def set_rtc_ns(ns):
+    """
+    Sets the RTC (UTC) to the given time in ns since the time.time() epoch.
     """
-    Calculates the current Central European Time (CET/CEST) including daylight saving.
+    from machine import RTC
+
+    tm = time.gmtime(ns // _NS)
+    RTC().datetime((tm[0], tm[1], tm[2], tm[6] + 1, tm[3], tm[4], tm[5], ns % _NS // 1000))
+
 
-    This function assumes the system clock has been previously set to UTC
-    (e.g., by `ntptime.settime()`).
+class NtpClient:
+    """
+    A non-blocking NTP client that queries several servers in parallel.
 
-    Returns:
-        tuple: A tuple formatted for `machine.RTC().datetime()`:
-               (year, month, day, weekday, hour, minute, second, subsecond)
-               Note: weekday is 1-7 (Monday-Sunday) for RTC.datetime().
+    start() sends one request to every server, poll() collects the answers
+    without blocking. When all servers answered or the round timed out, the
+    answer with the lowest round-trip time sets the RTC. The client then
+    re-syncs periodically, estimates the RTC drift from the offsets it
+    measures and corrects the clock in small steps between syncs.
     """
-    year = time.localtime()[0]
 
-    # Determine DST start and end times for the current year in Europe.
-    # DST starts on the last Sunday of March (at 1:00 UTC, which is 2:00 CET)
-    # Formula for last Sunday of a month: (31 - (int(5 * year / 4 + X)) % 7)
-    # For March (month 3), X=4. For October (month 10), X=1.
-    dst_start_utc = time.mktime(
-        (year, 3, (31 - (int(5 * year / 4 + 4)) % 7), 1, 0, 0, 0, 0)
-    )
-    # DST ends on the last Sunday of October (at 1:00 UTC, which is 2:00 CEST)
-    dst_end_utc = time.mktime(
-        (year, 10, (31 - (int(5 * year / 4 + 1)) % 7), 1, 0, 0, 0, 0)
-    )
+    def __init__(
+        self,
+        servers=NTP_SERVERS,
+        port=NTP_PORT,
+        timeout_ms=2000,
+        interval_ms=3600000,
+        correction_ms=60000,
+        set_time=set_rtc_ns,
+    ):
+        """
+        Initializes the NtpClient.
+
+        Args:
+            servers: Host names, or (host, port) tuples for stand-in servers.
+            port: Default UDP port.
+            timeout_ms: How long a round waits for answers.
+            interval_ms: Re-sync period after a successful round.
+            correction_ms: How often the drift correction runs.
+            set_time: Function taking the corrected time in ns (sets the RTC).
+        """
+        self.servers = [s if isinstance(s, tuple) else (s, port) for s in servers]
+        self.timeout_ms = timeout_ms
+        self.interval_ms = interval_ms
+        self.correction_ms = correction_ms
+        self.set_time = set_time
+
+        self.addresses = {}   # (host, port) -> resolved address
+        self.pending = []     # [sock, server, send_ticks_us, send_ns]
+        self.answers = []     # (rtt_us, offset_ns, server)
+        self.round_start = 0
+        self.next_round = time.ticks_ms()
+        self.failures = 0
 
-    now_utc = time.time()
+        self.synced = False
+        self.last_sync_ns = 0
+        self.last_offset_ns = 0
+        self.last_rtt_us = 0
+        self.last_server = None
+        self.drift_ppm = 0.0
+        self.last_correction_ns = 0
+        self.syncs = 0
 
-    # Apply timezone offset based on whether DST is active
-    if dst_start_utc <= now_utc < dst_end_utc:
-        # CEST: Central European Summer (UTC+2 hours)
-        offset_seconds = 7200
-    else:
-        # CET: Central European Time (UTC+1 hour)
-        offset_seconds = 3600
+    def _address(self, server):
+        address = self.addresses.get(server)
+        if address is None:
+            # DNS is blocking, so every name is only resolved once
+            address = socket.getaddrinfo(server[0], server[1], 0, socket.SOCK_DGRAM)[0][-1]
+            self.addresses[server] = address
+        return address
 
-    # Convert UTC time to local time with the determined offset
-    cet_tuple = time.localtime(now_utc + offset_seconds)
+    def start(self):
+        """
+        Sends a request to every server and starts a new round.
+        """
+        self._close()
+        self.answers = []
+        request = bytearray(48)
+        request[0] = 0x1B  # LI = 0, version 3, mode 3 (client)
+        for server in self.servers:
+            try:
+                address = self._address(server)
+            except Exception as e:
+                print(f"NTP server {server[0]} not resolved: {e}")
+                continue
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.setblocking(False)
+            try:
+                entry = [sock, server, time.ticks_us(), time.time_ns()]
+                sock.sendto(request, address)
+                self.pending.append(entry)
+            except OSError as e:
+                print(f"NTP request to {server[0]} failed: {e}")
+                sock.close()
+        self.round_start = time.ticks_ms()
+        self.next_round = None
+
+    def _receive(self, entry):
+        sock, server, send_us, t1 = entry
+        try:
+            data = sock.recv(48)
+        except OSError:
+            return False  # Nothing yet (EAGAIN)
+        rtt_us = time.ticks_diff(time.ticks_us(), send_us)
+        t4 = time.time_ns()
+        if len(data) < 48 or data[40:48] == bytes(8):
+            return True  # Malformed or unsynchronized server, drop it
+        t2 = _ntp_to_ns(data, 32)
+        t3 = _ntp_to_ns(data, 40)
+        offset_ns = ((t2 - t1) + (t3 - t4)) // 2
+        self.answers.append((rtt_us, offset_ns, server))
+        return True
 
-    # `time.localtime()` returns: (year, month, mday, hour, minute, second, weekday_0_6, yearday)
-    # `machine.RTC.datetime()` expects: (year, month, mday, weekday_1_7, hour, minute, second, microsecond)
-    # Note: `time.localtime()` weekday is 0-6 (Monday=0, Sunday=6).
-    # `machine.RTC.datetime()` expects 1-7 (Monday=1, Sunday=7).
+    def _close(self):
+        for entry in self.pending:
+            entry[0].close()
+        self.pending = []
 
-    year, month, day, hour, minute, second, weekday_0_6, _ = cet_tuple
+    def _finish(self):
+        self._close()
+        now = time.ticks_ms()
+        if not self.answers:
+            self.failures += 1
+            # Back off 2 s, 4 s, ... up to one minute
+            delay = min(60000, 1000 << min(self.failures, 6))
+            print(f"NTP sync failed, retrying in {delay // 1000} s")
+            self.next_round = time.ticks_add(now, delay)
+            return
 
-    # Adjust weekday format for the RTC
-    weekday_1_7 = weekday_0_6 + 1
+        self.failures = 0
+        rtt_us, offset_ns, server = min(self.answers)
+        self._apply(offset_ns)
+        self.last_rtt_us = rtt_us
+        self.last_server = server[0]
+        print(
+            f"NTP synced via {server[0]} (rtt {rtt_us // 1000} ms, "
+            f"offset {offset_ns // 1000000} ms, drift {self.drift_ppm:.1f} ppm)"
+        )
+        self.next_round = time.ticks_add(now, self.interval_ms)
 
-    # Create the tuple in the format expected by RTC.datetime()
-    rtc_tuple = (year, month, day, weekday_1_7, hour, minute, second, 0)
+    def _apply(self, offset_ns):
+        now_ns = time.time_ns()
+        if self.synced:
+            elapsed_ns = now_ns - self.last_sync_ns
+            if elapsed_ns > 60 * _NS:
+                # The offset is what remained after the drift correction so far
+                residual_ppm = offset_ns * 1000000 / elapsed_ns
+                self.drift_ppm = self.drift_ppm + residual_ppm / 2
+        self.set_time(now_ns + offset_ns)
+        self.synced = True
+        self.syncs += 1
+        self.last_offset_ns = offset_ns
+        self.last_sync_ns = now_ns + offset_ns
+        self.last_correction_ns = self.last_sync_ns
 
-    return rtc_tuple
+    def _correct_drift(self):
+        now_ns = time.time_ns()
+        elapsed_ns = now_ns - self.last_correction_ns
+        if elapsed_ns < self.correction_ms * 1000000:
+            return
+        # A positive drift means the RTC runs slow and has to be advanced
+        step_ns = int(elapsed_ns * self.drift_ppm / 1000000)
+        if abs(step_ns) >= 10000000:
+            self.set_time(now_ns + step_ns)
+            self.last_correction_ns = now_ns + step_ns
 
+    def poll(self):
+        """
+        Advances the client without blocking; call this from the main loop.
 
-def sync():
+        Returns:
+            bool: True if the clock was synchronized during this call.
+        """
+        if self.next_round is not None:
+            if time.ticks_diff(time.ticks_ms(), self.next_round) >= 0:
+                self.start()
+            elif self.synced and self.drift_ppm:
+                self._correct_drift()
+            return False
+
+        syncs = self.syncs
+        waiting = []
+        for entry in self.pending:
+            if self._receive(entry):
+                entry[0].close()
+            else:
+                waiting.append(entry)
+        self.pending = waiting
+        timed_out = time.ticks_diff(time.ticks_ms(), self.round_start) >= self.timeout_ms
+        if not self.pending or timed_out:
+            self._finish()
+        return self.syncs != syncs
+
+
+def sync(timeout_ms=5000):
     """
-    Synchronizes the device's real-time clock (RTC) with an NTP server (UTC)
-    and then sets the RTC to Central European Time (CET/CEST).
-    Retries a few times if it fails.
+    Synchronizes the device's real-time clock (RTC) with NTP, blocking until
+    the first answer or the timeout. The RTC is kept in UTC; local time is
+    derived by clock.TimeZone.
     """
-    print("Synchronizing RTC with NTP server (UTC)...")
-    rtc = RTC()
-    max_retries = 3
-    for attempt in range(max_retries):
-        try:
-            ntptime.settime()
-            if rtc.datetime()[0] > 2021:
-                cet_datetime = cettime()
-                rtc.datetime(cet_datetime)
-                print("Time synchronized successfully to CET/CEST.")
-                return
-        except Exception as e:
-            print(
-                f"Error synchronizing time (attempt {attempt + 1}/{max_retries}): {e}"
-            )
-            time.sleep(5)
-    raise RuntimeError("Failed to synchronize time.")
+    client = NtpClient(timeout_ms=timeout_ms)
+    client.start()
+    while not client.poll():
+        if client.next_round is not None:
+            raise RuntimeError("Failed to synchronize time.")
+        time.sleep_ms(10)
+    return client
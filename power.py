@@ -0,0 +1,266 @@
+# power.py
+import time
+import select
+import machine
+from knobs import knobs
+from task_handler import REFRESH_RATE
+
+# No data change for this long switches to idle (ms)
+IDLE_AFTER = knobs.define("power.idle_ms", 120000, 10000, 3600000)
+# LVGL refresh period while idle (ms)
+IDLE_REFRESH = knobs.define("power.idle_refresh_ms", 50, 5, 200)
+# Longest wait of the main loop while idle (ms); sockets wake it earlier
+IDLE_WAIT = knobs.define("power.idle_wait_ms", 1000, 100, 10000)
+# Backlight levels (percent)
+ACTIVE_LEVEL = knobs.define("power.active_level", 100, 0, 100)
+IDLE_LEVEL = knobs.define("power.idle_level", 40, 0, 100)
+NIGHT_LEVEL = knobs.define("power.night_level", 10, 0, 100)
+# Local hours of the night dimming, [start, end)
+NIGHT_START = knobs.define("power.night_start", 22, 0, 23)
+NIGHT_END = knobs.define("power.night_end", 6, 0, 23)
+# Use machine.lightsleep() instead of a socket wait while idle. LVGL and
+# the main loop stop completely, MQTT data is read after the wake-up.
+LIGHT_SLEEP = knobs.define("power.light_sleep", False)
+
+ACTIVE = "active"
+IDLE = "idle"
+
+
+class PowerManager:
+    """
+    Lowers the power draw while nothing changes.
+
+    Any store change except the clock counts as activity. Without activity
+    for IDLE_AFTER the manager goes idle: the LVGL refresh period is raised,
+    the backlight dims and Wi-Fi modem sleep is enabled. The first change
+    makes it active again.
+
+    wait() replaces the fixed main loop sleep. It returns as soon as the
+    MQTT socket becomes readable, so the loop can sleep up to IDLE_WAIT
+    while idle without delaying messages.
+
+    With LIGHT_SLEEP the whole chip sleeps, timers included, so the sleep
+    ends at the next clock tick or scheduler job if that comes before
+    IDLE_WAIT, and the clock is ticked right after waking.
+
+    The time spent per state, the share of time spent waiting and the
+    time-weighted backlight level are recorded to estimate the average
+    power (see stats()). The wake latency of a timed wait is its overshoot
+    of the deadline; for a wake by MQTT data it is the time from the
+    socket becoming readable until handled() is called after the messages
+    were read.
+    """
+
+    def __init__(self, store, handler, clock, set_backlight, mqtt=None, wlan=None, scheduler=None):
+        """
+        Initializes the PowerManager.
+
+        Args:
+            store: The Store whose changes count as activity.
+            handler: The TaskHandler whose refresh rate is lowered.
+            clock: The Clock; its TimeZone sets the night dimming schedule.
+            set_backlight: Function taking a level in percent.
+            mqtt: The MQTT wrapper whose socket wakes wait().
+            wlan: The WifiManager for modem sleep.
+            scheduler: The RefreshScheduler whose next job ends a light sleep.
+        """
+        self.store = store
+        self.handler = handler
+        self.clock = clock
+        self.tz = clock.tz
+        self.set_backlight = set_backlight
+        self.mqtt = mqtt
+        self.wlan = wlan
+        self.scheduler = scheduler
+        self.state = ACTIVE
+        self.last_activity = time.ticks_ms()
+        self.backlight = None
+
+        now = time.ticks_ms()
+        self.since = now
+        self.state_ms = {ACTIVE: 0, IDLE: 0}
+        self.wait_ms = 0
+        self.backlight_ms = 0  # Sum of level * ms
+        self.backlight_since = now
+        self.poller = None
+        self.polled = None
+        self.wakes = 0
+        self.socket_wakes = 0
+        self.woke_at = None  # ticks_us of the last wake by MQTT data
+        self.wake_latency_us = 0
+        self.max_wake_latency_us = 0
+
+        self._callback = self.on_change
+        store.subscribe_prefix("", self._callback)
+        # Registered after the TaskHandler's own watcher, so a new active
+        # period does not override the idle one
+        self._refresh_callback = self.on_refresh
+        knobs.watch(REFRESH_RATE.name, self._refresh_callback)
+        knobs.watch(IDLE_REFRESH.name, self._refresh_callback)
+        self.update_backlight()
+
+    def on_change(self, key, value):
+        """
+        Store subscriber: every change but the clock is activity.
+        """
+        if key.startswith("clock."):
+            return
+        self.activity()
+
+    def on_refresh(self, name, value):
+        """
+        Knob watcher: re-applies the idle refresh period while idle.
+        """
+        if self.state == IDLE:
+            self.handler.set_refresh_rate(None, IDLE_REFRESH.value)
+
+    def is_idle(self):
+        """
+        Returns True while idle.
+        """
+        return self.state == IDLE
+
+    def activity(self):
+        """
+        Records activity, e.g. a touch or a screen change; leaves idle.
+        """
+        self.last_activity = time.ticks_ms()
+        if self.state == IDLE:
+            self._enter(ACTIVE)
+
+    def _enter(self, state):
+        now = time.ticks_ms()
+        self.state_ms[self.state] += time.ticks_diff(now, self.since)
+        self.since = now
+        self.state = state
+        idle = state == IDLE
+        self.handler.set_refresh_rate(None, IDLE_REFRESH.value if idle else REFRESH_RATE.value)
+        if self.wlan is not None:
+            self.wlan.set_power_save(idle)
+        self.update_backlight()
+        print(f"Power: {state}")
+
+    def _level(self):
+        # A cold RTC starts at 2000-01-01, so the night schedule only
+        # applies once NTP has set the clock
+        if time.gmtime()[0] >= 2021:
+            hour = self.tz.localtime()[3]
+            start, end = NIGHT_START.value, NIGHT_END.value
+            # The night may wrap around midnight
+            night = (start <= hour or hour < end) if start > end else (start <= hour < end)
+            if night:
+                return NIGHT_LEVEL.value
+        return IDLE_LEVEL.value if self.state == IDLE else ACTIVE_LEVEL.value
+
+    def update_backlight(self):
+        """
+        Applies the backlight level of the current state and hour.
+        """
+        level = self._level()
+        if level != self.backlight:
+            now = time.ticks_ms()
+            if self.backlight is not None:
+                self.backlight_ms += self.backlight * time.ticks_diff(now, self.backlight_since)
+            self.backlight_since = now
+            self.backlight = level
+            self.set_backlight(level)
+
+    def poll(self):
+        """
+        Switches to idle after IDLE_AFTER without activity and follows the
+        dimming schedule. Call from the main loop.
+        """
+        if self.state == ACTIVE and time.ticks_diff(time.ticks_ms(), self.last_activity) >= IDLE_AFTER.value:
+            self._enter(IDLE)
+        self.update_backlight()
+
+    def _poller(self):
+        """
+        Returns a poller for the MQTT socket, or None while disconnected.
+        """
+        if self.mqtt is None or not self.mqtt.is_connected:
+            return None
+        sock = self.mqtt.client.sock
+        if sock is not self.polled:
+            # New connection: register its socket once, not on every wait
+            self.poller = select.poll()
+            self.poller.register(sock, select.POLLIN)
+            self.polled = sock
+        return self.poller
+
+    def wait(self, active_ms):
+        """
+        Waits until the next loop pass: active_ms while active, up to
+        IDLE_WAIT while idle. Returns early when MQTT data arrives.
+        """
+        timeout = active_ms if self.state == ACTIVE else IDLE_WAIT.value
+        start = time.ticks_us()
+        woke = False
+        if self.state == IDLE and LIGHT_SLEEP.value:
+            timeout = self._sleep_ms(timeout)
+            machine.lightsleep(timeout)
+            # The clock's timer stood still during the sleep
+            self.clock.tick()
+        else:
+            poller = self._poller()
+            if poller is None:
+                time.sleep_ms(timeout)
+            else:
+                woke = bool(poller.poll(timeout))
+        now = time.ticks_us()
+        elapsed = time.ticks_diff(now, start)
+        self.wait_ms += elapsed // 1000
+        if woke:
+            # Completed by handled() once the data has been read
+            self.woke_at = now
+        else:
+            # Overshoot of the deadline is the wake latency of a timed sleep
+            self._record_wake(max(0, elapsed - timeout * 1000))
+
+    def _sleep_ms(self, timeout):
+        """
+        Shortens a light sleep to the next clock tick or scheduler job.
+        """
+        timeout = min(timeout, self.clock.next_tick_ms())
+        if self.scheduler is not None:
+            due = self.scheduler.next_due_ms()
+            if due is not None:
+                timeout = min(timeout, due)
+        return max(1, timeout)
+
+    def handled(self):
+        """
+        Records the wake latency of a wake by MQTT data; call after the
+        messages were read.
+        """
+        if self.woke_at is not None:
+            self.socket_wakes += 1
+            self._record_wake(time.ticks_diff(time.ticks_us(), self.woke_at))
+            self.woke_at = None
+
+    def _record_wake(self, latency_us):
+        self.wakes += 1
+        self.wake_latency_us += latency_us
+        self.max_wake_latency_us = max(self.max_wake_latency_us, latency_us)
+
+    def stats(self):
+        """
+        Returns the time per state, the waiting share, the average backlight
+        level and the wake latency.
+        """
+        now = time.ticks_ms()
+        state_ms = dict(self.state_ms)
+        state_ms[self.state] += time.ticks_diff(now, self.since)
+        total = max(1, state_ms[ACTIVE] + state_ms[IDLE])
+        backlight_ms = self.backlight_ms + (self.backlight or 0) * time.ticks_diff(now, self.backlight_since)
+        return {
+            "state": self.state,
+            "active_ms": state_ms[ACTIVE],
+            "idle_ms": state_ms[IDLE],
+            "waiting_percent": 100 * self.wait_ms // total,
+            "backlight_avg": backlight_ms // total,
+            "wakes": self.wakes,
+            "socket_wakes": self.socket_wakes,
+            "wake_latency_avg_us": self.wake_latency_us // max(1, self.wakes),
+            "wake_latency_max_us": self.max_wake_latency_us,
+        }
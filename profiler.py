@@ -0,0 +1,81 @@
+# profiler.py
+import gc
+import time
+
+
+class _Stage:
+    """
+    Context manager recording one boot stage.
+    """
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profiler.begin(self.name)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.profiler.end()
+        return False
+
+
+class BootProfiler:
+    """
+    Records the duration and heap use of boot stages and named milestones
+    such as time-to-first-paint and time-to-first-data.
+
+    All times are time.ticks_ms() values, i.e. milliseconds since boot.
+    """
+
+    def __init__(self):
+        self.stages = []  # (name, start_ms, duration_ms, mem_free, mem_delta)
+        self.marks = {}   # name -> ms since boot
+        self._name = None
+        self._start = 0
+        self._mem = 0
+
+    def begin(self, name):
+        """
+        Starts timing a stage (ends the running one first).
+        """
+        if self._name is not None:
+            self.end()
+        self._name = name
+        self._mem = gc.mem_alloc()
+        self._start = time.ticks_ms()
+
+    def end(self):
+        """
+        Stops timing the running stage.
+        """
+        if self._name is None:
+            return
+        duration = time.ticks_diff(time.ticks_ms(), self._start)
+        alloc = gc.mem_alloc()
+        self.stages.append((self._name, self._start, duration, gc.mem_free(), alloc - self._mem))
+        self._name = None
+
+    def stage(self, name):
+        """
+        Returns a context manager timing the enclosed block as a stage.
+        """
+        return _Stage(self, name)
+
+    def mark(self, name):
+        """
+        Records a milestone once; later calls with the same name are ignored.
+        """
+        if name not in self.marks:
+            self.marks[name] = time.ticks_ms()
+
+    def report(self):
+        """
+        Prints all stages and milestones.
+        """
+        print("=== Boot profile ===")
+        for name, start, duration, free, delta in self.stages:
+            print(f"{name:<12} @{start:>6} ms  {duration:>6} ms  heap {delta:+d} B  free {free} B")
+        for name, at in self.marks.items():
+            print(f"{name:<12} @{at:>6} ms")
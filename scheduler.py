@@ -0,0 +1,167 @@
+# scheduler.py
+import time
+
+
+class _Job:
+    def __init__(self, key, callback, interval, due, max_age):
+        self.key = key
+        self.callback = callback
+        self.interval = interval
+        self.due = due
+        self.max_age = max_age
+        self.runs = 0
+
+
+class RefreshScheduler:
+    """
+    Spreads periodic refreshes (e.g. API requests) over time.
+
+    - Jobs never start closer together than `spacing_ms`, so N locations
+      never fire in a burst; their first runs are staggered the same way.
+    - A token bucket limits starts to `per_minute` per rolling minute.
+    - Requesting a job that is already due or running is coalesced.
+    - The job of the visible screen goes first when several are due.
+
+    poll() runs at most one job per call; call it from the main loop.
+    """
+
+    def __init__(self, per_minute=30, spacing_ms=5000):
+        """
+        Initializes the scheduler.
+
+        Args:
+            per_minute: API quota, job starts allowed per minute.
+            spacing_ms: Minimum time between two job starts.
+        """
+        self.per_minute = per_minute
+        self.spacing_ms = spacing_ms
+        self.jobs = []
+        self.visible = None
+        self.running = None
+        self.tokens = per_minute
+        self.refilled = time.ticks_ms()
+        self.last_start = time.ticks_add(time.ticks_ms(), -spacing_ms)
+        self.coalesced = 0
+        self.throttled = 0
+
+    def add(self, key, callback, interval, max_age=None):
+        """
+        Adds a periodic job. First runs are staggered by spacing_ms.
+
+        Args:
+            key: Unique name, e.g. the screen name of the location.
+            callback: Function without arguments doing the refresh.
+            interval: Refresh period in ms.
+            max_age: Data older than this (ms) is refreshed as soon as the
+                job's screen becomes visible; None disables it.
+        """
+        due = time.ticks_add(time.ticks_ms(), len(self.jobs) * self.spacing_ms)
+        self.jobs.append(_Job(key, callback, interval, due, max_age))
+
+    def remove(self, key):
+        """
+        Removes a job.
+        """
+        self.jobs = [job for job in self.jobs if job.key != key]
+
+    def set_interval(self, key, interval):
+        """
+        Changes the refresh period of a job; the next run moves accordingly.
+        """
+        job = self._job(key)
+        if job is None:
+            return
+        job.due = time.ticks_add(job.due, interval - job.interval)
+        if job.max_age is not None:
+            job.max_age = job.max_age * interval // job.interval
+        job.interval = interval
+
+    def _job(self, key):
+        for job in self.jobs:
+            if job.key == key:
+                return job
+        return None
+
+    def request(self, key):
+        """
+        Makes a job due now. Returns False if it was coalesced with a
+        run that is already due or in progress.
+        """
+        job = self._job(key)
+        if job is None:
+            return False
+        now = time.ticks_ms()
+        if self.running is job or time.ticks_diff(now, job.due) >= 0:
+            self.coalesced += 1
+            return False
+        job.due = now
+        return True
+
+    def set_visible(self, key):
+        """
+        Marks the job of the visible screen. If its data is older than the
+        job's max_age, it is requested right away.
+        """
+        self.visible = key
+        job = self._job(key)
+        if job is not None and job.max_age is not None:
+            age = job.interval - time.ticks_diff(job.due, time.ticks_ms())
+            if age >= job.max_age:
+                self.request(key)
+
+    def next_due_ms(self):
+        """
+        Returns the ms until poll() may start the next job (0 if one is
+        due now), or None without jobs.
+        """
+        if not self.jobs:
+            return None
+        now = time.ticks_ms()
+        due = min(time.ticks_diff(job.due, now) for job in self.jobs)
+        spacing = self.spacing_ms - time.ticks_diff(now, self.last_start)
+        return max(0, due, spacing)
+
+    def _refill(self, now):
+        elapsed = time.ticks_diff(now, self.refilled)
+        tokens = elapsed * self.per_minute // 60000
+        if tokens:
+            self.tokens = min(self.per_minute, self.tokens + tokens)
+            # Keep the remainder so slow refills are not lost
+            self.refilled = time.ticks_add(self.refilled, tokens * 60000 // self.per_minute)
+
+    def poll(self):
+        """
+        Starts the most urgent due job if spacing and quota allow it.
+
+        Returns:
+            bool: True if a job ran.
+        """
+        now = time.ticks_ms()
+        if time.ticks_diff(now, self.last_start) < self.spacing_ms:
+            return False
+        best = None
+        for job in self.jobs:
+            if time.ticks_diff(now, job.due) < 0:
+                continue
+            if job.key == self.visible:
+                best = job
+                break
+            if best is None or time.ticks_diff(job.due, best.due) < 0:
+                best = job
+        if best is None:
+            return False
+
+        self._refill(now)
+        if self.tokens <= 0:
+            self.throttled += 1
+            return False
+        self.tokens -= 1
+        self.last_start = now
+        self.running = best
+        try:
+            best.callback()
+        finally:
+            self.running = None
+            best.runs += 1
+            best.due = time.ticks_add(now, best.interval)
+        return True
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Builds the subset UI font loaded by fonts.py.
+
+The stock Montserrat fonts compiled into the firmware cover ASCII only
+(plus the degree sign and the LVGL symbols), so umlauts render as boxes.
+This script renders exactly the glyphs the UI needs - printable ASCII,
+the German umlauts, ß and the degree sign, plus any other non-ASCII
+character found in the given text files (e.g. sensor names) - into an
+LVGL binary font with lv_font_conv:
+
+    python3 scripts/build_font.py --font Montserrat-Medium.ttf
+    python3 scripts/build_font.py --font Montserrat-Medium.ttf --text sensor_names.txt
+
+With --compare the same font is also built with the character set of the
+stock font and with the full Latin-1 range, and the sizes are printed.
+The .bin size is both the flash used on the file system and, roughly, the
+RAM LVGL allocates when it loads the font; fonts.load() prints the
+measured RAM on the device.
+
+Requires Node.js; lv_font_conv is run through npx.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+OUTPUT_DIR = "fonts"
+# The stock lv_font_montserrat_14 is built with these options
+SIZE = 14
+BPP = 4
+ASCII_RANGE = "0x20-0x7F"
+# Umlauts, ß and the degree sign
+EXTRA_CHARS = "äöüÄÖÜß°"
+# Character sets to compare against
+STOCK_RANGE = "0x20-0x7F,0xB0,0x2022"
+LATIN1_RANGE = "0x20-0x7F,0xA0-0xFF"
+
+
+def collect_chars(paths: list) -> str:
+    """
+    Returns EXTRA_CHARS plus every non-ASCII character in the given files,
+    sorted and without duplicates.
+    """
+    chars = set(EXTRA_CHARS)
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            chars.update(c for c in f.read() if ord(c) > 0x7F and c.isprintable())
+    return "".join(sorted(chars))
+
+
+def convert(font: str, size: int, bpp: int, output: str, ranges: str, symbols: str = "") -> int:
+    """
+    Runs lv_font_conv for the given ranges and symbols.
+
+    Returns:
+        int: Size of the binary font in bytes.
+    """
+    command = [
+        "npx", "--yes", "lv_font_conv",
+        "--font", font, "--size", str(size), "--bpp", str(bpp),
+        "--no-compress", "--format", "bin", "-o", output,
+        "-r", ranges,
+    ]
+    if symbols:
+        command += ["--symbols", symbols]
+    subprocess.run(command, check=True)
+    return os.path.getsize(output)
+
+
+def main() -> None:
+    """
+    Parses the arguments, builds the font and prints the comparison.
+    """
+    parser = argparse.ArgumentParser(description="Build the subset UI font")
+    parser.add_argument("--font", required=True, help="TTF/WOFF source, e.g. Montserrat-Medium.ttf")
+    parser.add_argument("--size", type=int, default=SIZE)
+    parser.add_argument("--bpp", type=int, default=BPP, choices=(1, 2, 3, 4, 8))
+    parser.add_argument("--text", action="append", default=[], help="File with extra characters to include")
+    parser.add_argument("--output", help=f"Defaults to {OUTPUT_DIR}/ui_<size>.bin")
+    parser.add_argument("--compare", action="store_true", help="Also build the stock and Latin-1 sets")
+    args = parser.parse_args()
+
+    output = args.output or os.path.join(OUTPUT_DIR, f"ui_{args.size}.bin")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    chars = collect_chars(args.text)
+    try:
+        size = convert(args.font, args.size, args.bpp, output, ASCII_RANGE, chars)
+    except (OSError, subprocess.CalledProcessError) as e:
+        sys.exit(f"lv_font_conv failed: {e}")
+    glyphs = 0x7F - 0x20 + 1 + len(chars)
+    print(f"{output}: {glyphs} glyphs, {size} bytes ({chars})")
+
+    if args.compare:
+        print(f"\n{'character set':<24} {'glyphs':>6} {'bytes':>8}")
+        print(f"{'subset':<24} {glyphs:>6} {size:>8}")
+        with tempfile.TemporaryDirectory() as tmp:
+            for name, ranges, count in (("stock (without symbols)", STOCK_RANGE, 98),
+                                        ("Latin-1", LATIN1_RANGE, 96 + 96)):
+                other = convert(args.font, args.size, args.bpp, os.path.join(tmp, "font.bin"), ranges)
+                print(f"{name:<24} {count:>6} {other:>8}")
+        print("\nCopy the font to /fonts on the ESP32; fonts.py loads it at boot.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Benchmarks forecast.ForecastParser against a full json.loads of the same
+OpenWeatherMap forecast response.
+
+For every fixture and chunk size the response is fed to the stream parser
+in pieces, the way HttpConnectionPool.stream() delivers it, and the parse
+time and peak memory (tracemalloc) are reported next to json.loads. The
+results of both are compared, so the script doubles as a parser check.
+Every fixture is also run pretty-printed (indent=2).
+
+    python3 scripts/forecast_benchmark.py
+    python3 scripts/forecast_benchmark.py --chunk 256 --chunk 1024 --repeat 50
+
+Record a real response as a new fixture (requires the requests package):
+
+    OWM_API_KEY=... python3 scripts/forecast_benchmark.py --record Berlin,DE
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from forecast import Forecast, ForecastParser  # noqa: E402
+
+FIXTURES = os.path.join(ROOT, "scripts", "fixtures")
+API_URL = "https://api.openweathermap.org/data/2.5/forecast"
+
+
+def record_fixture(location: str, api_key: str) -> str:
+    """
+    Downloads the forecast for "City,CC" and stores it as a fixture.
+
+    Returns:
+        str: Path of the new fixture.
+    """
+    import requests
+
+    params = {"q": location, "appid": api_key, "units": "metric", "lang": "en"}
+    response = requests.get(API_URL, params=params, timeout=15)
+    response.raise_for_status()
+    city = location.split(",")[0].lower()
+    path = os.path.join(FIXTURES, f"forecast_{city}.json")
+    with open(path, "wb") as f:
+        f.write(response.content)
+    return path
+
+
+def measure(func, repeat: int) -> tuple:
+    """
+    Runs func() repeat times.
+
+    Returns:
+        tuple: (result, mean time in ms, peak bytes of one run)
+    """
+    tracemalloc.start()
+    result = func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return result, (time.perf_counter() - start) * 1000 / repeat, peak
+
+
+def parse_stream(body: bytes, chunk: int, parser: ForecastParser) -> Forecast:
+    """
+    Feeds body to the parser in chunks of at most `chunk` bytes.
+    """
+    parser.reset()
+    view = memoryview(body)
+    for offset in range(0, len(body), chunk):
+        parser.feed(view[offset:offset + chunk])
+    parser.finish()
+    return parser.forecast
+
+
+def check(forecast: Forecast, tree: dict) -> None:
+    """
+    Compares the stream parser's slots with the full JSON tree.
+    """
+    entries = tree["list"][:forecast.capacity]
+    assert forecast.count == len(entries), (forecast.count, len(entries))
+    assert forecast.utc_offset == tree["city"]["timezone"]
+    for i, entry in enumerate(entries):
+        assert forecast.stamps[i] == entry["dt"]
+        assert forecast.temps[i] == round(entry["main"]["temp"] * 10)
+        assert forecast.icon(i) == entry["weather"][0]["icon"]
+        assert forecast.pops[i] == int(entry.get("pop", 0) * 100 + 0.5)
+
+
+def main() -> None:
+    """
+    Parses the arguments and runs the benchmark.
+    """
+    parser = argparse.ArgumentParser(description="Forecast stream parser benchmark")
+    parser.add_argument("fixtures", nargs="*", help="Defaults to scripts/fixtures/forecast_*.json")
+    parser.add_argument("--chunk", type=int, action="append", help="Chunk size(s), default 256, 512, 1024")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--record", metavar="CITY,CC", help="Record a new fixture first")
+    parser.add_argument("--api-key", default=os.environ.get("OWM_API_KEY"))
+    args = parser.parse_args()
+
+    if args.record:
+        if not args.api_key:
+            parser.error("recording needs an API key (--api-key or OWM_API_KEY)")
+        print(f"Recorded {record_fixture(args.record, args.api_key)}")
+
+    paths = args.fixtures or sorted(glob.glob(os.path.join(FIXTURES, "forecast_*.json")))
+    chunks = args.chunk or [256, 512, 1024]
+    stream_parser = ForecastParser(Forecast())
+    print(f"Compact storage: {stream_parser.forecast.memory_bytes()} bytes")
+
+    bodies = []
+    for path in paths:
+        with open(path, "rb") as f:
+            body = f.read()
+        name = os.path.basename(path)
+        bodies.append((name, body))
+        # The same response pretty-printed, e.g. from a proxy or a mock server
+        bodies.append((f"{name} (indented)", json.dumps(json.loads(body), indent=2).encode()))
+
+    for name, body in bodies:
+        print(f"\n{name}: {len(body)} bytes")
+        tree, ms, peak = measure(lambda: json.loads(body), args.repeat)
+        print(f"  {'json.loads':<16} {ms:8.2f} ms  peak {peak:7d} bytes")
+        for chunk in chunks:
+            forecast, ms, peak = measure(lambda: parse_stream(body, chunk, stream_parser), args.repeat)
+            check(forecast, tree)
+            print(f"  {f'stream {chunk}':<16} {ms:8.2f} ms  peak {peak:7d} bytes"
+                  f"  ({forecast.count} slots, {forecast.days} days)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+A local UDP NTP stand-in server for testing ntp.NtpClient.
+
+It answers SNTP requests with the host time plus an optional offset and an
+optional artificial delay, so several instances on different ports can
+simulate fast, slow and wrong servers:
+
+    python3 scripts/ntp_standin.py --port 12301
+    python3 scripts/ntp_standin.py --port 12302 --delay 0.2 --offset 1.5
+
+Point the device at them in secrets.py:
+
+    NTP_SERVERS = (("192.168.1.10", 12301), ("192.168.1.10", 12302))
+"""
+
+import argparse
+import socket
+import struct
+import time
+
+# Seconds between the NTP epoch (1900) and the Unix epoch (1970)
+NTP_DELTA = 2208988800
+
+
+def to_ntp(timestamp: float) -> bytes:
+    """
+    Packs a Unix timestamp into a 64-bit NTP timestamp.
+
+    Args:
+        timestamp (float): Seconds since the Unix epoch.
+
+    Returns:
+        bytes: 8 bytes (seconds, fraction) in network byte order.
+    """
+    seconds = int(timestamp)
+    fraction = int((timestamp - seconds) * (1 << 32))
+    return struct.pack("!II", seconds + NTP_DELTA, fraction)
+
+
+def build_response(request: bytes, received: float, offset: float) -> bytes:
+    """
+    Builds an SNTP server response for a client request.
+
+    Args:
+        request (bytes): The 48-byte client request.
+        received (float): Host time when the request arrived.
+        offset (float): Seconds added to all server timestamps.
+
+    Returns:
+        bytes: The 48-byte response.
+    """
+    version = (request[0] >> 3) & 0x07
+    header = struct.pack(
+        "!BBbb II 4s",
+        (version << 3) | 4,  # LI = 0, mode 4 (server)
+        1,                   # Stratum 1
+        request[2],          # Poll interval
+        -20,                 # Precision (~1 us)
+        0,                   # Root delay
+        0,                   # Root dispersion
+        b"LOCL",             # Reference ID
+    )
+    reference = to_ntp(received + offset)
+    originate = request[40:48]
+    return header + reference + originate + reference + to_ntp(time.time() + offset)
+
+
+def main() -> None:
+    """
+    Parses the arguments and serves requests until interrupted.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="0.0.0.0", help="Address to bind")
+    parser.add_argument("--port", type=int, default=12300, help="UDP port")
+    parser.add_argument("--offset", type=float, default=0.0, help="Seconds added to the reported time")
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds to wait before answering")
+    parser.add_argument("--drop", type=int, default=0, help="Ignore every Nth request (0 = never)")
+    args = parser.parse_args()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind((args.host, args.port))
+    print(f"NTP stand-in listening on {args.host}:{args.port} (offset {args.offset}s, delay {args.delay}s)")
+
+    count = 0
+    while True:
+        request, address = sock.recvfrom(512)
+        received = time.time()
+        count += 1
+        if len(request) < 48:
+            continue
+        if args.drop and count % args.drop == 0:
+            print(f"Dropping request #{count} from {address[0]}")
+            continue
+        if args.delay:
+            time.sleep(args.delay)
+        sock.sendto(build_response(request, received, args.offset), address)
+        print(f"Answered request #{count} from {address[0]}:{address[1]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Local TLS stand-in servers for testing tls.TlsContext and http_pool on the device.
+
+Two modes, both with a self-signed certificate that is created on first use
+(requires the `openssl` command line tool):
+
+    # HTTPS keep-alive server answering every GET with a JSON file
+    python3 scripts/tls_standin.py http --port 8443 --body weather.json
+
+    # TLS terminating proxy in front of a plain MQTT broker
+    python3 scripts/tls_standin.py proxy --port 8883 --upstream 127.0.0.1:1883
+
+Each handshake is logged with its duration and whether the session was
+resumed. Copy tls_standin/cert.pem to the device and set
+TLS_CA_FILE = "cert.pem" in secrets.py to verify the certificate.
+"""
+
+import argparse
+import http.server
+import os
+import socket
+import socketserver
+import ssl
+import subprocess
+import threading
+import time
+
+CERT_DIR = "tls_standin"
+
+
+def ensure_certificate(cert_dir: str, common_name: str) -> tuple:
+    """
+    Creates a self-signed certificate unless one exists.
+
+    Args:
+        cert_dir (str): Directory for cert.pem and key.pem.
+        common_name (str): Host name / IP the device connects to.
+
+    Returns:
+        tuple: (cert_path, key_path)
+    """
+    cert = os.path.join(cert_dir, "cert.pem")
+    key = os.path.join(cert_dir, "key.pem")
+    if not (os.path.exists(cert) and os.path.exists(key)):
+        os.makedirs(cert_dir, exist_ok=True)
+        san = f"IP:{common_name}" if common_name.replace(".", "").isdigit() else f"DNS:{common_name}"
+        subprocess.run(
+            [
+                "openssl", "req", "-x509", "-newkey", "ec", "-pkeyopt", "ec_paramgen_curve:prime256v1",
+                "-nodes", "-days", "365", "-keyout", key, "-out", cert,
+                "-subj", f"/CN={common_name}", "-addext", f"subjectAltName={san}",
+            ],
+            check=True,
+        )
+        print(f"Created self-signed certificate {cert}")
+    return cert, key
+
+
+def server_context(cert: str, key: str, tls12: bool) -> ssl.SSLContext:
+    """
+    Builds the server SSLContext with session tickets enabled.
+
+    Args:
+        cert (str): Certificate path.
+        key (str): Private key path.
+        tls12 (bool): Limit to TLS 1.2 (session IDs as used by mbedTLS clients).
+
+    Returns:
+        ssl.SSLContext: The server context.
+    """
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+    if tls12:
+        context.maximum_version = ssl.TLSVersion.TLSv1_2
+    return context
+
+
+def log_handshake(conn: ssl.SSLSocket, address: tuple, duration: float) -> None:
+    """
+    Prints one line per completed handshake.
+    """
+    resumed = "resumed" if conn.session_reused else "full"
+    print(f"{address[0]}:{address[1]} {conn.version()} {resumed} handshake in {duration * 1000:.1f} ms")
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive
+    body = b"{}"
+
+    def do_GET(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, fmt: str, *args) -> None:
+        print(f"{self.client_address[0]} request on connection: {fmt % args}")
+
+
+class _TlsHttpServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+    context = None
+
+    def get_request(self) -> tuple:
+        sock, address = self.socket.accept()
+        start = time.perf_counter()
+        conn = self.context.wrap_socket(sock, server_side=True)
+        log_handshake(conn, address, time.perf_counter() - start)
+        return conn, address
+
+
+def serve_http(args: argparse.Namespace, context: ssl.SSLContext) -> None:
+    """
+    Runs the HTTPS keep-alive server.
+    """
+    if args.body:
+        with open(args.body, "rb") as f:
+            _Handler.body = f.read()
+    server = _TlsHttpServer((args.host, args.port), _Handler)
+    server.context = context
+    print(f"HTTPS stand-in on {args.host}:{args.port}")
+    server.serve_forever()
+
+
+def _pipe(src: socket.socket, dst: socket.socket) -> None:
+    try:
+        while True:
+            data = src.recv(4096)
+            if not data:
+                break
+            dst.sendall(data)
+    except OSError:
+        pass
+    finally:
+        for s in (src, dst):
+            try:
+                s.close()
+            except OSError:
+                pass
+
+
+def serve_proxy(args: argparse.Namespace, context: ssl.SSLContext) -> None:
+    """
+    Runs the TLS terminating proxy.
+    """
+    upstream_host, upstream_port = args.upstream.rsplit(":", 1)
+    listener = socket.create_server((args.host, args.port))
+    print(f"TLS proxy on {args.host}:{args.port} -> {args.upstream}")
+    while True:
+        sock, address = listener.accept()
+        try:
+            start = time.perf_counter()
+            conn = context.wrap_socket(sock, server_side=True)
+            log_handshake(conn, address, time.perf_counter() - start)
+            upstream = socket.create_connection((upstream_host, int(upstream_port)))
+        except (OSError, ssl.SSLError) as e:
+            print(f"{address[0]}: {e}")
+            sock.close()
+            continue
+        threading.Thread(target=_pipe, args=(conn, upstream), daemon=True).start()
+        threading.Thread(target=_pipe, args=(upstream, conn), daemon=True).start()
+
+
+def main() -> None:
+    """
+    Parses the arguments and starts the selected stand-in.
+    """
+    parser = argparse.ArgumentParser(description="Local TLS stand-in servers")
+    parser.add_argument("mode", choices=("http", "proxy"))
+    parser.add_argument("--host", default="0.0.0.0", help="Address to bind")
+    parser.add_argument("--port", type=int, default=8443)
+    parser.add_argument("--name", default="127.0.0.1", help="Certificate common name (host or IP)")
+    parser.add_argument("--cert-dir", default=CERT_DIR)
+    parser.add_argument("--tls12", action="store_true", help="Limit to TLS 1.2")
+    parser.add_argument("--body", help="File served by the http mode")
+    parser.add_argument("--upstream", default="127.0.0.1:1883", help="Broker for the proxy mode")
+    args = parser.parse_args()
+
+    cert, key = ensure_certificate(args.cert_dir, args.name)
+    context = server_context(cert, key, args.tls12)
+    if args.mode == "http":
+        serve_http(args, context)
+    else:
+        serve_proxy(args, context)
+
+
+if __name__ == "__main__":
+    main()
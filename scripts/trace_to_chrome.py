@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Converts a trace dump written by tracer.Tracer.dump() into the Chrome trace
+event format, which chrome://tracing and https://ui.perfetto.dev open.
+
+Enable tracing with TRACE_ENABLED = True in secrets.py. The device writes
+trace.bin after a fault or Ctrl+C, or on demand from the REPL:
+
+    >>> import tracer; tracer.dump()
+
+Copy it to the host and convert it:
+
+    mpremote cp :trace.bin .
+    python3 scripts/trace_to_chrome.py trace.bin -o trace.json
+"""
+
+import argparse
+import json
+import struct
+from array import array
+
+MAGIC = b"TRC2"
+HEADER = "<4sBBBI"
+PHASES = {66: "B", 69: "E", 105: "i"}
+TRACK_NAMES = {1: "main loop", 2: "timer callbacks"}
+
+
+def read_dump(path: str) -> tuple:
+    """
+    Reads a trace dump and merges the rings of all tracks.
+
+    ticks_us wraps around, so every ring is unwrapped backwards from the
+    ticks_us value taken at the dump, which all rings share.
+
+    Returns:
+        tuple: (names as [(name, track)], events as [(us, id, phase)] in time order)
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, name_count, ticks_bits, ring_count, now = struct.unpack_from(HEADER, data)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a trace dump")
+    period = 1 << ticks_bits
+    pos = struct.calcsize(HEADER)
+    names = []
+    for _ in range(name_count):
+        length, track = data[pos], data[pos + 1]
+        names.append((data[pos + 2:pos + 2 + length].decode(), track))
+        pos += 2 + length
+    events = []
+    for _ in range(ring_count):
+        count = struct.unpack_from("<H", data, pos)[0]
+        pos += 2
+        stamps = array("I")
+        stamps.frombytes(data[pos:pos + 4 * count])
+        pos += 4 * count
+        ids = data[pos:pos + count]
+        phases = data[pos + count:pos + 2 * count]
+        pos += 2 * count
+        # Microseconds before the dump, newest event first
+        before = 0
+        later = now
+        ring = []
+        for i in range(count - 1, -1, -1):
+            before += (later - stamps[i]) % period
+            later = stamps[i]
+            ring.append((-before, ids[i], phases[i]))
+        ring.reverse()
+        events.extend(ring)
+    # Stable: events of the same microsecond keep their order within a ring
+    events.sort(key=lambda event: event[0])
+    if events:
+        first = events[0][0]
+        events = [(us - first, event_id, phase) for us, event_id, phase in events]
+    return names, events
+
+
+def to_chrome(names: list, events: list) -> dict:
+    """
+    Builds the Chrome trace document.
+
+    End events whose begin was overwritten in the ring are skipped, and
+    events still open at the end are closed.
+    """
+    trace = []
+    open_events = {}  # track -> stack of names
+    elapsed = 0
+    for elapsed, event_id, phase in events:
+        name, track = names[event_id]
+        stack = open_events.setdefault(track, [])
+        ph = PHASES.get(phase)
+        if ph == "B":
+            stack.append(name)
+        elif ph == "E":
+            if name not in stack:
+                continue
+            # Close anything left open inside this event as well
+            while stack:
+                inner = stack.pop()
+                if inner == name:
+                    break
+                trace.append({"name": inner, "ph": "E", "ts": elapsed, "pid": 1, "tid": track})
+        elif ph is None:
+            continue
+        event = {"name": name, "ph": ph, "ts": elapsed, "pid": 1, "tid": track}
+        if ph == "i":
+            event["s"] = "t"
+        trace.append(event)
+    for track, stack in open_events.items():
+        while stack:
+            trace.append({"name": stack.pop(), "ph": "E", "ts": elapsed, "pid": 1, "tid": track})
+    for track in open_events:
+        trace.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": track,
+                      "args": {"name": TRACK_NAMES.get(track, f"track {track}")}})
+    return {"traceEvents": trace, "displayTimeUnit": "ms", "otherData": {"duration_us": elapsed}}
+
+
+def main() -> None:
+    """
+    Parses the arguments and converts the dump.
+    """
+    parser = argparse.ArgumentParser(description="Convert a device trace dump to Chrome trace JSON")
+    parser.add_argument("dump", help="trace.bin from the device")
+    parser.add_argument("-o", "--output", default="trace.json")
+    args = parser.parse_args()
+
+    names, events = read_dump(args.dump)
+    document = to_chrome(names, events)
+    with open(args.output, "w") as f:
+        json.dump(document, f)
+    duration = document["otherData"]["duration_us"] / 1000
+    print(f"{len(events)} events, {duration:.1f} ms, written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Weather bridge: fetches OpenWeatherMap once and fans it out over MQTT.
+
+Instead of every display polling OpenWeatherMap itself, this script runs on
+a host (e.g. next to the broker), fetches the current weather at a fixed
+interval and publishes a compact, retained record that the devices read
+with weather_source.MqttWeatherSource (WEATHER_SOURCE = "mqtt" or
+"mqtt+http" in secrets.py).
+
+Record format (JSON list, see weather_source.RECORD_KEYS):
+    [1, unix_time, icon, temp, feels_like, humidity, pressure, wind_m_s, description]
+
+Requires: pip install requests paho-mqtt
+
+    OWM_API_KEY=... python3 scripts/weather_bridge.py --city Berlin --country DE \\
+        --broker 192.168.1.2 --topic Weather/current
+"""
+
+import argparse
+import json
+import os
+import time
+
+import requests
+
+try:
+    import paho.mqtt.client as mqtt
+except ImportError:  # pragma: no cover - optional dependency
+    mqtt = None
+
+API_URL = "https://api.openweathermap.org/data/2.5/weather"
+RECORD_VERSION = 1
+
+
+def fetch_weather(api_key: str, city: str, country: str, lang: str) -> dict:
+    """
+    Fetches the current weather for a city.
+
+    Args:
+        api_key (str): OpenWeatherMap API key.
+        city (str): City name.
+        country (str): Country code.
+        lang (str): Language of the description.
+
+    Returns:
+        dict: The decoded OpenWeatherMap response.
+    """
+    params = {"q": f"{city},{country}", "appid": api_key, "units": "metric", "lang": lang}
+    response = requests.get(API_URL, params=params, timeout=15)
+    response.raise_for_status()
+    return response.json()
+
+
+def build_record(data: dict) -> str:
+    """
+    Digests an OpenWeatherMap response into the compact device record.
+
+    Args:
+        data (dict): The OpenWeatherMap response.
+
+    Returns:
+        str: The JSON encoded record.
+    """
+    weather = data["weather"][0]
+    main = data["main"]
+    record = [
+        RECORD_VERSION,
+        int(data.get("dt", time.time())),
+        weather["icon"],
+        round(main["temp"], 1),
+        round(main["feels_like"], 1),
+        main["humidity"],
+        main["pressure"],
+        round(data["wind"]["speed"], 1),
+        weather["description"],
+    ]
+    return json.dumps(record, separators=(",", ":"), ensure_ascii=False)
+
+
+def main() -> None:
+    """
+    Parses the arguments and publishes the weather until interrupted.
+    """
+    parser = argparse.ArgumentParser(description="OpenWeatherMap to MQTT bridge")
+    parser.add_argument("--api-key", default=os.environ.get("OWM_API_KEY"), help="Defaults to $OWM_API_KEY")
+    parser.add_argument("--city", required=True)
+    parser.add_argument("--country", required=True)
+    parser.add_argument("--lang", default="en")
+    parser.add_argument("--broker", default="localhost")
+    parser.add_argument("--port", type=int, default=1883)
+    parser.add_argument("--user", default=os.environ.get("MQTT_USER"))
+    parser.add_argument("--password", default=os.environ.get("MQTT_PASSWORD"))
+    parser.add_argument("--topic", default="Weather/current")
+    parser.add_argument("--interval", type=int, default=600, help="Seconds between fetches")
+    parser.add_argument("--once", action="store_true", help="Publish once and exit")
+    args = parser.parse_args()
+
+    if not args.api_key:
+        parser.error("an API key is required (--api-key or OWM_API_KEY)")
+    if mqtt is None:
+        parser.error("paho-mqtt is not installed (pip install paho-mqtt)")
+
+    client = mqtt.Client()
+    if args.user:
+        client.username_pw_set(args.user, args.password)
+    client.connect(args.broker, args.port)
+    client.loop_start()
+
+    try:
+        while True:
+            try:
+                record = build_record(fetch_weather(args.api_key, args.city, args.country, args.lang))
+                # Retained, so devices get the last record right after subscribing
+                client.publish(args.topic, record.encode(), qos=1, retain=True).wait_for_publish()
+                print(f"Published to {args.topic}: {record}")
+            except (requests.RequestException, KeyError, ValueError) as e:
+                print(f"Weather fetch failed: {e}")
+            if args.once:
+                break
+            time.sleep(args.interval)
+    finally:
+        client.loop_stop()
+        client.disconnect()
+
+
+if __name__ == "__main__":
+    main()
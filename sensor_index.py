@@ -0,0 +1,136 @@
+# sensor_index.py
+from array import array
+import time
+
+# Shown in front of values restored from a snapshot until live data arrives
+STALE_MARK = "~"
+
+
+class SensorIndex:
+    """
+    A compact, name-sorted index of the latest value of every sensor.
+
+    Every sensor owns a slot in a set of parallel arrays (value, unit id,
+    timestamp). The sorted order is a plain list of names that is kept
+    sorted on insert, so row lookups are a binary search and no per-sensor
+    dicts or widgets are allocated.
+    """
+
+    def __init__(self):
+        self.order = []   # Sensor names, sorted
+        self.slots = {}   # Name -> slot in the arrays below
+        self.values = array("f")
+        self.units = array("B")
+        self.stamps = array("I")
+        self.unit_names = [""]
+        self.texts = {}   # Slot -> raw value for non-numeric readings
+        self.live = bytearray()  # Per slot: 0 while restored, 1 once updated
+
+    def __len__(self):
+        return len(self.order)
+
+    def position(self, name):
+        """
+        Returns the sorted position of `name`, or where it would be inserted.
+        """
+        order = self.order
+        lo, hi = 0, len(order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if order[mid] < name:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _unit_id(self, unit):
+        # Publishers may send "unit": null or a number
+        unit = str(unit or "")
+        try:
+            return self.unit_names.index(unit)
+        except ValueError:
+            if len(self.unit_names) >= 255:
+                return 0
+            self.unit_names.append(unit)
+            return len(self.unit_names) - 1
+
+    def update(self, name, value, unit="", stamp=None):
+        """
+        Stores the latest reading of a sensor.
+
+        Returns:
+            tuple: (position, inserted) where `inserted` is True for new sensors.
+        """
+        if stamp is None:
+            stamp = int(time.time())
+        slot = self.slots.get(name)
+        inserted = slot is None
+        if inserted:
+            slot = len(self.values)
+            self.slots[name] = slot
+            self.values.append(0.0)
+            self.units.append(0)
+            self.stamps.append(0)
+            self.live.append(1)
+            position = self.position(name)
+            self.order.insert(position, name)
+        else:
+            position = self.position(name)
+
+        try:
+            self.values[slot] = float(value)
+            self.texts.pop(slot, None)
+        except (TypeError, ValueError):
+            self.texts[slot] = str(value)
+        self.units[slot] = self._unit_id(unit)
+        self.stamps[slot] = stamp
+        self.live[slot] = 1
+        return position, inserted
+
+    def load(self, names, values, units, stamps, unit_names):
+        """
+        Replaces the contents with restored readings, all marked stale.
+
+        The arrays are taken over as they are; `names` must be sorted and
+        slot i belongs to names[i], so no per-sensor insert is needed.
+        """
+        self.order = names
+        self.slots = {name: i for i, name in enumerate(names)}
+        self.values = values
+        self.units = units
+        self.stamps = stamps
+        self.unit_names = unit_names
+        self.texts = {}
+        self.live = bytearray(len(names))
+
+    def is_live(self, name):
+        """
+        Returns False while a sensor only has a restored reading.
+        """
+        return bool(self.live[self.slots[name]])
+
+    def name_at(self, position):
+        """
+        Returns the sensor name at a sorted position.
+        """
+        return self.order[position]
+
+    def text(self, name):
+        """
+        Returns the display text for the latest value of a sensor.
+        """
+        slot = self.slots[name]
+        unit = self.unit_names[self.units[slot]]
+        if slot in self.texts:
+            value = self.texts[slot]
+        else:
+            value = "{:g}".format(self.values[slot])
+        if not self.live[slot]:
+            value = STALE_MARK + value
+        return f"{value} {unit}" if unit else value
+
+    def stamp(self, name):
+        """
+        Returns the timestamp of the latest value of a sensor.
+        """
+        return self.stamps[self.slots[name]]
@@ -0,0 +1,112 @@
+# sensor_table.py
+import lvgl as lv
+from timer import Timer
+import fonts
+
+# Rows materialized in the lv.table (excluding the header)
+VISIBLE_ROWS = 10
+# How long each page is shown before flipping (ms)
+PAGE_INTERVAL = 5000
+
+
+class SensorTable:
+    """
+    A virtualized view of a SensorIndex.
+
+    The lv.table always has VISIBLE_ROWS rows. Only the sensors of the current
+    page are written to it, and pages are flipped by a timer, so the widget
+    cost stays the same for 10 or 1000 sensors.
+    """
+
+    def __init__(self, parent, index, rows=VISIBLE_ROWS, page_interval=PAGE_INTERVAL):
+        """
+        Initializes the table view.
+
+        Args:
+            parent: The LVGL parent object.
+            index: The SensorIndex to display.
+            rows: Number of visible rows.
+            page_interval: Page flip period in ms.
+        """
+        self.index = index
+        self.rows = rows
+        self.offset = 0
+        self.page_count = 1
+
+        self.table = lv.table(parent)
+        self.table.set_column_count(2)
+        self.table.set_row_count(rows + 1)
+        self.table.set_column_width(0, 150)
+        self.table.set_column_width(1, 80)
+        self.table.set_style_pad_ver(2, lv.PART.ITEMS)
+        self.table.set_cell_value(0, 0, "Sensor")
+        self.table.set_cell_value(0, 1, "Value")
+
+        self.page_label = lv.label(parent)
+        self.page_label.set_text("")
+
+        self.page_timer = Timer(self.next_page, page_interval)
+
+    def pages(self):
+        """
+        Returns the number of pages.
+        """
+        return max(1, (len(self.index) + self.rows - 1) // self.rows)
+
+    def _render_row(self, row):
+        position = self.offset + row
+        if position < len(self.index):
+            name = self.index.name_at(position)
+            self.table.set_cell_value(row + 1, 0, fonts.text(name))
+            self.table.set_cell_value(row + 1, 1, fonts.text(self.index.text(name)))
+        else:
+            self.table.set_cell_value(row + 1, 0, "")
+            self.table.set_cell_value(row + 1, 1, "")
+
+    def _render_page_label(self):
+        self.page_count = self.pages()
+        if self.page_count > 1:
+            self.page_label.set_text(f"{self.offset // self.rows + 1}/{self.page_count}")
+        else:
+            self.page_label.set_text("")
+
+    def render(self):
+        """
+        Rewrites all visible rows and the page indicator.
+        """
+        for row in range(self.rows):
+            self._render_row(row)
+        self._render_page_label()
+
+    def show_page(self, page):
+        """
+        Shows the given page (0-based, wraps around).
+        """
+        self.offset = (page % self.pages()) * self.rows
+        self.render()
+
+    def next_page(self, timer=None):
+        """
+        Flips to the next page if there is more than one.
+        """
+        if self.pages() > 1:
+            self.show_page(self.offset // self.rows + 1)
+
+    def updated(self, position, inserted):
+        """
+        Refreshes the view after SensorIndex.update().
+
+        Args:
+            position: Sorted position of the updated sensor.
+            inserted: True if the sensor was new.
+        """
+        end = self.offset + self.rows
+        if inserted:
+            # Rows at and after the insert position shift down by one
+            if position < end:
+                self.render()
+            elif self.pages() != self.page_count:
+                self._render_page_label()
+        elif self.offset <= position < end:
+            row = position - self.offset
+            self.table.set_cell_value(row + 1, 1, fonts.text(self.index.text(self.index.name_at(position))))
@@ -1,41 +1,60 @@
 # sensors.py
 import lvgl as lv
 import ujson
+from history import HistoryStore
+from aggregate import SensorAggregator
+from sensor_index import SensorIndex
+from sensor_table import SensorTable
+from sparkline import Sparkline
+from snapshot import SensorSnapshot, SNAPSHOT_FILE
+from timer import Timer
+from memory import governor
+import fonts
 
+# Total bytes available for sensor history samples
+HISTORY_BUDGET = 16384
+# Samples kept per sensor
+HISTORY_CAPACITY = 120
+# How long each sensor is shown in the sparkline (ms)
+FOCUS_INTERVAL = 5000
+# Readings per second and burst accepted per sensor topic; faster
+# publishers are coalesced to their latest value
+SENSOR_RATE = 2
+SENSOR_BURST = 3
 
-class SensorScreen:
-    """
-    A screen to display sensor data.
-    """
-
-    def __init__(self, mqtt):
-        self.mqtt = mqtt
-        self.screen = lv.obj()
 
-        self.table = lv.table(self.screen)
-        self.table.center()
-
-        self.table.set_column_width(0, 150)
-        self.table.set_column_width(1, 80)
-
-        self.table.set_cell_value(0, 0, "Sensor")
-        self.table.set_cell_value(0, 1, "Value")
-
-        self.sensors = {}
-        self.next_row = 1
+class SensorFeed:
+    """
+    Receives sensor readings from MQTT and publishes them to the store.
 
-        self.subscribe_to_topics()
+    Every reading is written to the single key "sensor" as a (name, value,
+    unit) tuple, and the new history sample count to "history" as a (name,
+    total) tuple. Two keys serve all sensors, so the store does not grow
+    with their number; the SensorIndex and HistoryStore keep the state.
+    A SensorAggregator taps the same topics before rate limiting and rolls
+    the numeric readings up into windows.
+    """
 
-    def get_screen(self):
+    def __init__(self, mqtt, store):
         """
-        Returns the screen object.
+        Initializes the SensorFeed.
+
+        Args:
+            mqtt: The MQTT client instance for communication.
+            store: The Store receiving the readings.
         """
-        return self.screen
+        self.mqtt = mqtt
+        self.store = store
+        self.history = HistoryStore(HISTORY_BUDGET, HISTORY_CAPACITY)
+        self.aggregator = SensorAggregator(mqtt)
+        self.subscribe_to_topics()
 
     def subscribe_to_topics(self):
         """
         Subscribes to the MQTT topics for the sensors.
         """
+        self.mqtt.tap("Sensor/#", self.aggregator.on_message)
+        self.mqtt.set_limit("Sensor/#", rate=SENSOR_RATE, burst=SENSOR_BURST)
         self.mqtt.subscribe("Sensor/#", self.handle_sensor_data)
 
     def handle_sensor_data(self, topic, msg):
@@ -46,15 +65,118 @@ class SensorScreen:
             sensor_name = topic.decode().split("/")[-1]
             data = ujson.loads(msg)
             value = data.get("value")
-            unit = data.get("unit", "")
+            unit = str(data.get("unit") or "")
 
-            if sensor_name not in self.sensors:
-                self.sensors[sensor_name] = {"row": self.next_row}
-                self.table.set_cell_value(self.next_row, 0, sensor_name)
-                self.next_row += 1
+            self.store.set("sensor", (sensor_name, value, unit))
 
-            row = self.sensors[sensor_name]["row"]
-            self.table.set_cell_value(row, 1, f"{value} {unit}")
+            try:
+                history = self.history.record(sensor_name, float(value))
+                self.store.set("history", (sensor_name, history.total))
+            except (TypeError, ValueError):
+                pass
 
         except Exception as e:
             print(f"Error handling sensor data: {e}")
+
+
+class SensorScreen:
+    """
+    A screen to display sensor data.
+    """
+
+    def __init__(self, store, feed, snapshot_file=SNAPSHOT_FILE):
+        """
+        Initializes the SensorScreen.
+
+        Readings saved before the last reboot are restored right away and
+        shown as stale until their sensor publishes again.
+
+        Args:
+            store: The Store holding the sensor readings.
+            feed: The SensorFeed owning the sensor histories.
+            snapshot_file: File persisting the latest readings, None to disable.
+        """
+        self.store = store
+        self.history = feed.history
+        self.screen = lv.obj()
+
+        # Latest value per sensor, only the visible page is materialized
+        self.sensors = SensorIndex()
+        self.table = SensorTable(self.screen, self.sensors)
+        self.table.table.align(lv.ALIGN.TOP_MID, 0, 0)
+        self.table.page_label.align(lv.ALIGN.BOTTOM_RIGHT, -10, -62)
+
+        self.snapshot = None
+        if snapshot_file:
+            self.snapshot = SensorSnapshot(self.sensors, snapshot_file)
+            if self.snapshot.restore():
+                self.table.render()
+
+        # History of the focused sensor
+        self.sparkline_label = lv.label(self.screen)
+        self.sparkline_label.set_text("")
+        self.sparkline_label.align(lv.ALIGN.BOTTOM_LEFT, 10, -62)
+        self.sparkline = Sparkline(self.screen, width=220, height=56)
+        self.sparkline.chart.align(lv.ALIGN.BOTTOM_MID, 0, -4)
+        self.focus_timer = Timer(self.rotate_focus, FOCUS_INTERVAL)
+
+        store.subscribe("sensor", self.on_reading)
+        store.subscribe("history", self.on_history)
+        governor.on_pressure(self.release_history)
+
+    def get_screen(self):
+        """
+        Returns the screen object.
+        """
+        return self.screen
+
+    def on_reading(self, key, reading):
+        """
+        Shows a changed sensor reading in the table.
+        """
+        name, value, unit = reading
+        position, inserted = self.sensors.update(name, value, unit)
+        self.table.updated(position, inserted)
+        if self.snapshot is not None:
+            self.snapshot.touch()
+
+    def release_history(self):
+        """
+        Frees the older half of the sensor histories (memory pressure).
+        """
+        released = self.history.release((self.sparkline.name,))
+        print(f"Released {released} sensor histories")
+
+    def on_history(self, key, update):
+        """
+        Feeds new history samples to the sparkline.
+        """
+        name = update[0]
+        if name == self.sparkline.name:
+            self.sparkline.sync(self.history.get(name))
+        elif self.sparkline.name is None or self.history.get(self.sparkline.name) is None:
+            self.focus(name)
+
+    def focus(self, name):
+        """
+        Shows the history of the given sensor in the sparkline.
+        """
+        history = self.history.get(name)
+        if history is None:
+            return
+        self.sparkline_label.set_text(fonts.text(name))
+        self.sparkline.show(name, history)
+
+    def rotate_focus(self, timer=None):
+        """
+        Moves the sparkline to the next sensor that has a history.
+        """
+        names = self.history.names()
+        if not names:
+            return
+        if self.sparkline.name in names:
+            index = (names.index(self.sparkline.name) + 1) % len(names)
+        else:
+            index = 0
+        if names[index] != self.sparkline.name:
+            self.focus(names[index])
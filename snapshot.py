@@ -0,0 +1,164 @@
+# snapshot.py
+from array import array
+import os
+import struct
+import time
+
+SNAPSHOT_FILE = "sensors.snap"
+_MAGIC = b"SNP1"
+# Magic, sensor count, unit count
+_HEADER = "<4sHB"
+
+
+def _encode(text):
+    """
+    Returns text as UTF-8, cut to at most 255 bytes on a character boundary.
+    """
+    encoded = str(text).encode()
+    if len(encoded) > 255:
+        end = 255
+        # Back up over continuation bytes to the start of the cut character
+        while end and encoded[end] & 0xC0 == 0x80:
+            end -= 1
+        encoded = encoded[:end]
+    return encoded
+
+
+class SensorSnapshot:
+    """
+    Persists the latest reading of every sensor so the table is filled
+    right after boot, before MQTT is connected.
+
+    The file holds the sorted names followed by the raw value, unit and
+    timestamp arrays of a SensorIndex, so loading is a single read and a
+    few slices instead of one insert per sensor. Non-numeric readings are
+    not saved.
+
+    Writes are debounced: the snapshot is saved once readings have been
+    quiet for `quiet_ms`, but never more often than every `min_interval_ms`,
+    to keep flash wear low. The file is replaced via rename, so a power
+    loss during a write keeps the previous snapshot.
+    """
+
+    def __init__(self, index, path=SNAPSHOT_FILE, quiet_ms=30000, min_interval_ms=600000):
+        """
+        Initializes the SensorSnapshot.
+
+        Args:
+            index: The SensorIndex to save and restore.
+            path: Snapshot file.
+            quiet_ms: Time without changes before a write.
+            min_interval_ms: Minimum time between two writes.
+        """
+        self.index = index
+        self.path = path
+        self.quiet_ms = quiet_ms
+        self.min_interval_ms = min_interval_ms
+        self.dirty = False
+        self.changed = 0
+        self.written = time.ticks_ms()
+        self.writes = 0
+        self.load_ms = 0
+
+    def restore(self):
+        """
+        Loads the snapshot into the index.
+
+        Returns:
+            int: Number of restored sensors (0 if there is no valid snapshot).
+        """
+        start = time.ticks_us()
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+            magic, count, unit_count = struct.unpack_from(_HEADER, data)
+            if magic != _MAGIC:
+                raise ValueError("Bad snapshot header")
+            pos = struct.calcsize(_HEADER)
+            unit_names = []
+            for _ in range(unit_count):
+                n = data[pos]
+                unit_names.append(data[pos + 1:pos + 1 + n].decode())
+                pos += 1 + n
+            names = []
+            for _ in range(count):
+                n = data[pos]
+                names.append(data[pos + 1:pos + 1 + n].decode())
+                pos += 1 + n
+            # bytes initializers are copied raw into the arrays
+            values = array("f", data[pos:pos + 4 * count])
+            pos += 4 * count
+            units = array("B", data[pos:pos + count])
+            pos += count
+            stamps = array("I", data[pos:pos + 4 * count])
+            if len(stamps) != count:
+                raise ValueError("Truncated snapshot")
+        except (OSError, ValueError, IndexError) as e:
+            print(f"No sensor snapshot restored: {e}")
+            return 0
+        self.index.load(names, values, units, stamps, unit_names)
+        self.load_ms = time.ticks_diff(time.ticks_us(), start) / 1000
+        print(f"Restored {count} sensors from snapshot in {self.load_ms:.1f} ms")
+        return count
+
+    def touch(self):
+        """
+        Marks the snapshot as outdated; call on every new reading.
+        """
+        self.dirty = True
+        self.changed = time.ticks_ms()
+
+    def poll(self):
+        """
+        Writes the snapshot if it is dirty, quiet and the minimum interval
+        has passed. Call from the main loop.
+
+        Returns:
+            bool: True if the snapshot was written.
+        """
+        if not self.dirty:
+            return False
+        now = time.ticks_ms()
+        if time.ticks_diff(now, self.changed) < self.quiet_ms:
+            # Keep waiting for quiet, unless changes never stop
+            if time.ticks_diff(now, self.written) < 2 * self.min_interval_ms:
+                return False
+        if time.ticks_diff(now, self.written) < self.min_interval_ms:
+            return False
+        self.save()
+        return True
+
+    def save(self):
+        """
+        Writes the snapshot now. Errors are logged, never raised; a failed
+        write is retried after `min_interval_ms`.
+        """
+        index = self.index
+        tmp = self.path + ".tmp"
+        self.written = time.ticks_ms()
+        try:
+            names = [name for name in index.order if index.slots[name] not in index.texts]
+            slots = [index.slots[name] for name in names]
+            values = array("f", [index.values[slot] for slot in slots])
+            units = bytearray([index.units[slot] for slot in slots])
+            stamps = array("I", [index.stamps[slot] for slot in slots])
+            with open(tmp, "wb") as f:
+                f.write(struct.pack(_HEADER, _MAGIC, len(names), len(index.unit_names)))
+                for text in index.unit_names + names:
+                    encoded = _encode(text)
+                    f.write(bytes((len(encoded),)))
+                    f.write(encoded)
+                f.write(values)
+                f.write(units)
+                f.write(stamps)
+            try:
+                os.rename(tmp, self.path)
+            except OSError:
+                # File systems that do not replace on rename (FAT)
+                os.remove(self.path)
+                os.rename(tmp, self.path)
+        except Exception as e:
+            print(f"Error writing sensor snapshot: {e}")
+            return
+        self.dirty = False
+        self.writes += 1
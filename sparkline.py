@@ -0,0 +1,91 @@
+# sparkline.py
+import lvgl as lv
+
+# Chart values are integers, so samples are stored with one decimal place
+_SCALE = 10
+
+
+class Sparkline:
+    """
+    A small lv.chart line showing the history of one sensor.
+
+    A full history is only drawn when the shown sensor changes. New samples
+    of the same sensor are shifted in point by point.
+    """
+
+    def __init__(self, parent, width=220, height=60, points=32):
+        """
+        Initializes the sparkline.
+
+        Args:
+            parent: The LVGL parent object.
+            width: Width in pixels.
+            height: Height in pixels.
+            points: Number of chart points (buckets).
+        """
+        self.points = points
+        self.chart = lv.chart(parent)
+        self.chart.set_size(width, height)
+        self.chart.set_type(lv.chart.TYPE.LINE)
+        self.chart.set_point_count(points)
+        self.chart.set_div_line_count(0, 0)
+        # Hide the point markers, only the line is drawn
+        self.chart.set_style_size(0, 0, lv.PART.INDICATOR)
+        self.series = self.chart.add_series(
+            lv.palette_main(lv.PALETTE.BLUE), lv.chart.AXIS.PRIMARY_Y
+        )
+        self.name = None
+        self.drawn = 0  # history.total at the last drawn sample
+        self.low = 0
+        self.high = 0
+
+    def _set_range(self, low, high):
+        if high <= low:
+            high = low + _SCALE
+        self.low = low
+        self.high = high
+        self.chart.set_range(lv.chart.AXIS.PRIMARY_Y, low, high)
+
+    def show(self, name, history):
+        """
+        Redraws the sparkline from a complete history.
+        """
+        self.name = name
+        self.drawn = history.total
+        mins, maxs, avgs = history.downsample(self.points)
+        self.chart.set_all_value(self.series, lv.CHART_POINT_NONE)
+        if not len(avgs):
+            self._set_range(0, _SCALE)
+            self.chart.refresh()
+            return
+
+        self._set_range(int(min(mins) * _SCALE), int(max(maxs) * _SCALE) + 1)
+        for value in avgs:
+            self.chart.set_next_value(self.series, int(value * _SCALE))
+        self.chart.refresh()
+
+    def sync(self, history):
+        """
+        Shifts in the samples added to the shown history since the last draw.
+
+        Falls back to a full redraw when too many samples arrived to be
+        shifted in one by one, or when the history was cleared.
+        """
+        new = history.total - self.drawn
+        if new == 0:
+            return
+        if new < 0 or new >= self.points or new > len(history):
+            self.show(self.name, history)
+            return
+        for value in history.recent(new):
+            self.push(value)
+        self.drawn = history.total
+
+    def push(self, value):
+        """
+        Shifts a single new sample into the sparkline.
+        """
+        scaled = int(value * _SCALE)
+        if scaled < self.low or scaled > self.high:
+            self._set_range(min(scaled, self.low), max(scaled + 1, self.high))
+        self.chart.set_next_value(self.series, scaled)
@@ -0,0 +1,37 @@
+# splash.py
+import lvgl as lv
+
+
+class SplashScreen:
+    """
+    A boot screen with a progress bar, shown while the network comes up.
+    """
+
+    def __init__(self, title="Starting..."):
+        self.screen = lv.obj()
+
+        self.title_label = lv.label(self.screen)
+        self.title_label.set_text(title)
+        self.title_label.align(lv.ALIGN.CENTER, 0, -30)
+
+        self.bar = lv.bar(self.screen)
+        self.bar.set_size(180, 12)
+        self.bar.set_range(0, 100)
+        self.bar.align(lv.ALIGN.CENTER, 0, 0)
+
+        self.status_label = lv.label(self.screen)
+        self.status_label.set_text("")
+        self.status_label.align(lv.ALIGN.CENTER, 0, 25)
+
+    def get_screen(self):
+        """
+        Returns the screen object.
+        """
+        return self.screen
+
+    def progress(self, percent, text):
+        """
+        Updates the progress bar and the status text.
+        """
+        self.bar.set_value(percent, lv.ANIM.OFF)
+        self.status_label.set_text(text)
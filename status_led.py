@@ -1,25 +1,97 @@
 # status_led.py
-from machine import Pin
+from machine import Pin, Timer
 from neopixel import NeoPixel
-import time
+
+# Pattern priorities, higher preempts lower
+PRIORITY_LOW = 0
+PRIORITY_NORMAL = 1
+PRIORITY_HIGH = 2
+
+OFF = (0, 0, 0)
+
+
+class Pattern:
+    """
+    An LED animation: a sequence of (color, duration_ms) steps.
+    """
+
+    def __init__(self, steps, repeat=1, priority=PRIORITY_NORMAL):
+        """
+        Args:
+            steps: List of ((r, g, b), duration_ms) tuples.
+            repeat: How often the steps are played, 0 = until stopped.
+            priority: PRIORITY_LOW, PRIORITY_NORMAL or PRIORITY_HIGH.
+        """
+        self.steps = steps
+        self.repeat = repeat
+        self.priority = priority
+
+
+def blink_pattern(color, on_ms=500, off_ms=500, repeat=1, priority=PRIORITY_NORMAL):
+    """
+    Returns a pattern switching between color and off.
+    """
+    return Pattern([(color, on_ms), (OFF, off_ms)], repeat, priority)
+
+
+def pulse_pattern(color, period_ms=1500, steps=10, repeat=0, priority=PRIORITY_LOW):
+    """
+    Returns a pattern fading color in and out.
+    """
+    frames = []
+    step_ms = max(1, period_ms // (2 * steps))
+    for i in list(range(1, steps + 1)) + list(range(steps - 1, -1, -1)):
+        frames.append((tuple(c * i // steps for c in color), step_ms))
+    return Pattern(frames, repeat, priority)
+
+
+def code_pattern(color, code, on_ms=200, gap_ms=200, pause_ms=1000, repeat=0,
+                 priority=PRIORITY_HIGH):
+    """
+    Returns a status code pattern: `code` short blinks followed by a pause.
+    """
+    steps = []
+    for _ in range(code):
+        steps.append((color, on_ms))
+        steps.append((OFF, gap_ms))
+    steps.append((OFF, pause_ms))
+    return Pattern(steps, repeat, priority)
 
 
 class StatusLed:
     """
     A class to control a NeoPixel status LED.
+
+    Animations are played by a one-shot hardware timer that is re-armed for
+    every step, so no method ever sleeps. Patterns are queued: the one with
+    the highest priority plays, patterns of equal priority play in order, and
+    a preempted pattern is restarted once the higher one has finished. A
+    continuous pattern (repeat=0), playing or queued, is replaced by a newer
+    one of equal priority.
     """
 
-    def __init__(self, pin_number=48, num_pixels=1):
+    def __init__(self, pin_number=48, num_pixels=1, timer_id=1):
+        # Timer 0 drives LVGL (see task_handler.py)
         self.pin = Pin(pin_number, Pin.OUT)
         self.np = NeoPixel(self.pin, num_pixels)
+        self.timer = Timer(timer_id)
+        self.queue = []  # (priority, sequence, pattern)
+        self.sequence = 0
+        self.pattern = None
+        self.step = 0
+        self.loops = 0
         self.off()
 
+    def _write(self, color):
+        self.np[0] = color
+        self.np.write()
+
     def set_color(self, r, g, b):
         """
-        Sets the color of the LED.
+        Stops all animations and sets a solid color.
         """
-        self.np[0] = (r, g, b)
-        self.np.write()
+        self.stop()
+        self._write((r, g, b))
 
     def off(self):
         """
@@ -27,24 +99,100 @@ class StatusLed:
         """
         self.set_color(0, 0, 0)
 
+    def play(self, pattern):
+        """
+        Queues a pattern and returns immediately.
+
+        Returns:
+            Pattern: The pattern, to stop() it later.
+        """
+        # Continuous patterns of equal priority, queued or playing, are replaced
+        self.queue = [entry for entry in self.queue
+                      if entry[2].repeat or entry[0] != pattern.priority]
+        current = self.pattern
+        if current is not None and not current.repeat and current.priority == pattern.priority:
+            current = None
+        self.sequence += 1
+        self.queue.append((pattern.priority, self.sequence, pattern))
+        if current is None or pattern.priority > current.priority:
+            self._next()
+        return pattern
+
+    def stop(self, pattern=None):
+        """
+        Stops a queued or playing pattern, or all patterns if none is given.
+        """
+        if pattern is None:
+            self.queue = []
+        else:
+            self.queue = [entry for entry in self.queue if entry[2] is not pattern]
+        if pattern is None or pattern is self.pattern:
+            # Starts the next pattern, or turns the LED off if none is left
+            self._next()
+
+    def _next(self):
+        # Start the highest priority pattern, oldest first among equals
+        self.timer.deinit()
+        if not self.queue:
+            if self.pattern is not None:
+                self.pattern = None
+                self._write(OFF)
+            return
+        best = 0
+        for i, entry in enumerate(self.queue):
+            if entry[0] > self.queue[best][0]:
+                best = i
+        self.pattern = self.queue[best][2]
+        self.step = 0
+        self.loops = 0
+        self._run_step()
+
+    def _run_step(self):
+        color, duration = self.pattern.steps[self.step]
+        self._write(color)
+        self.timer.init(mode=Timer.ONE_SHOT, period=int(duration), callback=self._on_timer)
+
+    def _on_timer(self, timer):
+        pattern = self.pattern
+        if pattern is None:
+            return
+        self.step += 1
+        if self.step >= len(pattern.steps):
+            self.step = 0
+            self.loops += 1
+            if pattern.repeat and self.loops >= pattern.repeat:
+                self.queue = [entry for entry in self.queue if entry[2] is not pattern]
+                self._next()
+                return
+        self._run_step()
+
     def blink(self, color, duration=0.5, num_blinks=1):
         """
-        Blinks the LED with a given color.
+        Blinks the LED with a given color without blocking.
+        """
+        ms = int(duration * 1000)
+        return self.play(blink_pattern(color, ms, ms, num_blinks))
+
+    def pulse(self, color, period_ms=1500):
+        """
+        Slowly fades the LED in and out until stopped.
+        """
+        return self.play(pulse_pattern(color, period_ms))
+
+    def status_code(self, color, code):
+        """
+        Repeats `code` short blinks until stopped.
         """
-        for _ in range(num_blinks):
-            self.set_color(*color)
-            time.sleep(duration)
-            self.off()
-            time.sleep(duration)
+        return self.play(code_pattern(color, code))
 
     def wifi_connecting(self):
         """
         Blinks green to indicate Wi-Fi is connecting.
         """
-        self.blink((0, 255, 0))
+        return self.play(blink_pattern((0, 255, 0), repeat=0))
 
     def mqtt_connecting(self):
         """
         Blinks yellow to indicate MQTT is connecting.
         """
-        self.blink((255, 255, 0))
+        return self.play(blink_pattern((255, 255, 0), repeat=0))
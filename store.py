@@ -0,0 +1,168 @@
+# store.py
+
+
+class Store:
+    """
+    A central observable key/value store.
+
+    Data sources (MQTT, HTTP) write values into the store and screens
+    subscribe to the keys they display. Subscribers are only notified when a
+    value actually changes, so writing the same value again costs a single
+    comparison.
+    """
+
+    def __init__(self):
+        self.values = {}
+        self.subscribers = {}
+        self.prefix_subscribers = []
+
+    def get(self, key, default=None):
+        """
+        Returns the current value of a key.
+        """
+        return self.values.get(key, default)
+
+    def subscribe(self, key, callback):
+        """
+        Registers callback(key, value) for changes of a single key.
+        """
+        self.subscribers.setdefault(key, []).append(callback)
+
+    def subscribe_prefix(self, prefix, callback):
+        """
+        Registers callback(key, value) for changes of every key starting with prefix.
+        """
+        self.prefix_subscribers.append((prefix, callback))
+
+    def unsubscribe(self, callback):
+        """
+        Removes a callback from all keys and prefixes.
+
+        Pass the same object that was subscribed; a bound method has to be
+        kept in a variable because MicroPython creates a new one per access.
+        """
+        for key in self.subscribers:
+            self.subscribers[key] = [
+                cb for cb in self.subscribers[key] if cb is not callback
+            ]
+        self.prefix_subscribers = [
+            entry for entry in self.prefix_subscribers if entry[1] is not callback
+        ]
+
+    def _callbacks(self, key):
+        callbacks = self.subscribers.get(key, ())
+        if self.prefix_subscribers:
+            callbacks = list(callbacks)
+            for prefix, callback in self.prefix_subscribers:
+                if key.startswith(prefix):
+                    callbacks.append(callback)
+        return callbacks
+
+    def _changed(self, key, value):
+        if key in self.values and self.values[key] == value:
+            return False
+        self.values[key] = value
+        return True
+
+    def set(self, key, value):
+        """
+        Stores a value and notifies subscribers if it changed.
+
+        Returns:
+            bool: True if the value changed.
+        """
+        if not self._changed(key, value):
+            return False
+        for callback in self._callbacks(key):
+            try:
+                callback(key, value)
+            except Exception as e:
+                print(f"Store callback error for '{key}': {e}")
+        return True
+
+    def update(self, values):
+        """
+        Stores several values at once.
+
+        Every changed value is written before any subscriber runs, and a
+        callback watching several of the changed keys runs only once (with the
+        last of its changed keys).
+
+        Returns:
+            int: Number of changed keys.
+        """
+        pending = []
+        changed = 0
+        for key, value in values.items():
+            if not self._changed(key, value):
+                continue
+            changed += 1
+            for callback in self._callbacks(key):
+                for i, entry in enumerate(pending):
+                    if entry[0] is callback:
+                        pending[i] = (callback, key, value)
+                        break
+                else:
+                    pending.append((callback, key, value))
+        for callback, key, value in pending:
+            try:
+                callback(key, value)
+            except Exception as e:
+                print(f"Store callback error for '{key}': {e}")
+        return changed
+
+
+class TextBinding:
+    """
+    Keeps a label's text in sync with one or more store keys.
+
+    The text is recomputed only when one of the keys changes, and set_text()
+    is only called when the resulting text differs from what is shown.
+    """
+
+    def __init__(self, store, label, keys, render, partial=False):
+        """
+        Initializes the binding.
+
+        Args:
+            store: The Store to observe.
+            label: An object with set_text(), usually an lv.label.
+            keys: The store keys the text depends on.
+            render: Function taking the key values in order, returning the text.
+                    It is not called while any of the keys is unset.
+            partial: Call render as soon as one key is set, passing None for
+                     the unset ones.
+        """
+        self.store = store
+        self.label = label
+        self.keys = keys
+        self.render = render
+        self.partial = partial
+        self.text = None
+        self._callback = self.refresh
+        for key in keys:
+            store.subscribe(key, self._callback)
+        self.refresh()
+
+    def refresh(self, key=None, value=None):
+        """
+        Recomputes the text and updates the label if it changed.
+        """
+        values = []
+        for k in self.keys:
+            v = self.store.get(k)
+            if v is None and not self.partial:
+                return
+            values.append(v)
+        if values.count(None) == len(values):
+            return
+        text = self.render(*values)
+        if text != self.text:
+            self.text = text
+            self.label.set_text(text)
+
+    def unbind(self):
+        """
+        Stops following the store.
+        """
+        self.store.unsubscribe(self._callback)
@@ -1,6 +1,10 @@
 # task_handler.py
 import lvgl as lv
 from machine import Timer
+from tracer import tracer
+from knobs import knobs
+
+REFRESH_RATE = knobs.define("lvgl.refresh_ms", 5, 1, 50)
 
 
 class TaskHandler:
@@ -9,27 +13,45 @@ class TaskHandler:
     Uses Timer 0 with periodic callback.
     """
 
-    def __init__(self, refresh_rate_ms=5):
+    def __init__(self, refresh_rate_ms=None):
         """
         Initialize the task handler with hardware timer.
 
         Args:
-            refresh_rate_ms: How often to update LVGL (default 5ms = 200Hz)
+            refresh_rate_ms: How often to update LVGL (default: the
+                "lvgl.refresh_ms" knob, 5ms = 200Hz)
         """
+        if refresh_rate_ms is None:
+            refresh_rate_ms = REFRESH_RATE.value
+            knobs.watch(REFRESH_RATE.name, self.set_refresh_rate)
         self.refresh_rate_ms = refresh_rate_ms
+        if tracer is not None:
+            self._trace_id = tracer.register("lvgl.task_handler", track=2)
 
         # Create hardware timer (ESP32-S3 has timers 0-3)
         self.timer = Timer(0)
+        self._start_timer()
+
+        print(f"TaskHandler initialized (Hardware Timer 0, {refresh_rate_ms}ms period)")
 
+    def _start_timer(self):
         # Initialize with periodic mode
         # IMPORTANT: period must be a number, not a string!
         self.timer.init(
             mode=Timer.PERIODIC,
-            period=int(refresh_rate_ms),  # Ensure it is an int
-            callback=self._timer_callback
+            period=int(self.refresh_rate_ms),  # Ensure it is an int
+            # The traced callback is only installed while tracing is enabled
+            callback=self._timer_callback if tracer is None else self._traced_callback
         )
 
-        print(f"TaskHandler initialized (Hardware Timer 0, {refresh_rate_ms}ms period)")
+    def set_refresh_rate(self, name, refresh_rate_ms):
+        """
+        Re-arms the timer with a new period (knob watcher).
+        """
+        self.refresh_rate_ms = refresh_rate_ms
+        self.timer.deinit()
+        self._start_timer()
+        print(f"TaskHandler period set to {refresh_rate_ms}ms")
 
     def _timer_callback(self, timer):
         """
@@ -42,6 +64,15 @@ class TaskHandler:
         except Exception as e:
             print(f"TaskHandler error: {e}")
 
+    def _traced_callback(self, timer):
+        """
+        _timer_callback with trace events, on its own track because it
+        interrupts the main loop. Allocates nothing.
+        """
+        tracer.begin(self._trace_id)
+        self._timer_callback(timer)
+        tracer.end(self._trace_id)
+
     def deinit(self):
         """
         Stop and deinitialize the timer.
@@ -0,0 +1,116 @@
+# tls.py
+import ssl
+import time
+
+try:
+    from secrets import TLS_CA_FILE
+except ImportError:
+    TLS_CA_FILE = None  # No file: certificates are not verified
+
+
+class TlsContext:
+    """
+    A shared TLS client context with handshake statistics.
+
+    The SSLContext and its CA certificates are set up once and reused for
+    every connection. If the ssl module supports sessions (the `session`
+    argument and attribute, as in CPython), the last session per host is
+    offered on the next handshake so reconnects are resumed instead of
+    paying a full handshake.
+
+    The object can be passed as the `ssl` argument of umqtt.simple.MQTTClient.
+    """
+
+    def __init__(self, cafile=TLS_CA_FILE):
+        """
+        Initializes the context.
+
+        Args:
+            cafile: PEM file with trusted CA certificates, or None to skip
+                    certificate verification.
+        """
+        self.context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+        if cafile:
+            with open(cafile, "rb") as f:
+                self.context.load_verify_locations(cadata=f.read())
+            self.context.verify_mode = ssl.CERT_REQUIRED
+        else:
+            if hasattr(self.context, "check_hostname"):
+                self.context.check_hostname = False
+            self.context.verify_mode = ssl.CERT_NONE
+        self.sessions = {}  # host -> last session
+        self.supports_sessions = True
+        self.handshakes = 0
+        self.resumed = 0
+        self.handshake_ms = 0
+        self.last_handshake_ms = 0
+        self.max_handshake_ms = 0
+
+    def wrap_socket(self, sock, server_hostname=None, **kwargs):
+        """
+        Wraps a connected socket and performs the handshake.
+        """
+        session = self.sessions.get(server_hostname) if self.supports_sessions else None
+        start = time.ticks_ms()
+        if session is not None:
+            try:
+                tls_sock = self.context.wrap_socket(
+                    sock, server_hostname=server_hostname, session=session, **kwargs
+                )
+            except TypeError:
+                # This ssl module has no session support
+                self.supports_sessions = False
+                session = None
+        if session is None:
+            tls_sock = self.context.wrap_socket(sock, server_hostname=server_hostname, **kwargs)
+        duration = time.ticks_diff(time.ticks_ms(), start)
+
+        self.handshakes += 1
+        self.handshake_ms += duration
+        self.last_handshake_ms = duration
+        if duration > self.max_handshake_ms:
+            self.max_handshake_ms = duration
+        if getattr(tls_sock, "session_reused", False):
+            self.resumed += 1
+        self.remember(tls_sock, server_hostname)
+        return tls_sock
+
+    def remember(self, tls_sock, server_hostname):
+        """
+        Stores the session of a socket for resumption. Call it again before
+        closing a long-lived socket: TLS 1.3 tickets arrive after the handshake.
+        """
+        if not self.supports_sessions or not server_hostname:
+            return
+        session = getattr(tls_sock, "session", None)
+        if session is None:
+            self.supports_sessions = False
+        else:
+            self.sessions[server_hostname] = session
+
+    def stats(self):
+        """
+        Returns a dict with handshake statistics.
+        """
+        return {
+            "handshakes": self.handshakes,
+            "resumed": self.resumed,
+            "handshake_ms": self.handshake_ms,
+            "last_handshake_ms": self.last_handshake_ms,
+            "max_handshake_ms": self.max_handshake_ms,
+            "sessions": self.supports_sessions,
+        }
+
+
+# Shared by MQTT and HTTPS so both reuse the same certificates and sessions
+context = None
+
+
+def get_context():
+    """
+    Returns the shared TlsContext, creating it on first use.
+    """
+    global context
+    if context is None:
+        context = TlsContext()
+    return context
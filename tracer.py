@@ -0,0 +1,192 @@
+# tracer.py
+from array import array
+import struct
+import time
+
+try:
+    from secrets import TRACE_ENABLED
+except ImportError:
+    TRACE_ENABLED = False
+
+# Events kept per track (power of two), 6 bytes each
+TRACE_EVENTS = 1024
+TRACE_FILE = "trace.bin"
+
+PHASE_BEGIN = 66  # "B"
+PHASE_END = 69    # "E"
+PHASE_INSTANT = 105  # "i"
+
+_MAGIC = b"TRC2"
+# Magic, name count, ticks_us period (log2), ring count, ticks_us at dump
+_HEADER = "<4sBBBI"
+# time.ticks_us() wraps at 2**30 on MicroPython ports
+_TICKS_BITS = 30
+
+
+class _Ring:
+    """
+    The events of one track in parallel arrays, oldest overwritten first.
+    """
+
+    def __init__(self, events):
+        self.mask = events - 1
+        self.stamps = array("I", bytearray(4 * events))
+        self.ids = bytearray(events)
+        self.phases = bytearray(events)
+        self.head = 0
+        self.count = 0
+
+    def record(self, event_id, phase):
+        h = self.head
+        self.stamps[h] = time.ticks_us()
+        self.ids[h] = event_id
+        self.phases[h] = phase
+        self.head = (h + 1) & self.mask
+        if self.count <= self.mask:
+            self.count += 1
+
+    def clear(self):
+        self.head = 0
+        self.count = 0
+
+    def write(self, f):
+        size = self.mask + 1
+        n = min(self.count, size)
+        # Oldest event first: the part after head, then the part before it
+        start = (self.head - n) & self.mask
+        parts = ((start, size), (0, self.head)) if start + n > size else ((start, start + n),)
+        f.write(struct.pack("<H", n))
+        for data in (memoryview(self.stamps), memoryview(self.ids), memoryview(self.phases)):
+            for a, b in parts:
+                f.write(data[a:b])
+        return n
+
+
+class Tracer:
+    """
+    Records begin/end events into preallocated ring buffers.
+
+    An event is a ticks_us timestamp, a name id and a phase, stored in
+    parallel arrays, so recording allocates nothing. Every track has its
+    own ring: timer callbacks (track 2) can run between any two bytecodes
+    of the main loop (track 1), and separate rings keep either from
+    overwriting the other's events. The oldest events are overwritten.
+    dump() writes the rings to flash, where scripts/trace_to_chrome.py
+    merges them into a Chrome / Perfetto trace.
+    """
+
+    def __init__(self, events=TRACE_EVENTS):
+        """
+        Initializes the Tracer.
+
+        Args:
+            events: Ring size per track, a power of two.
+        """
+        self.events = events
+        self.rings = []
+        self.ring_tracks = []
+        self.names = []  # (name, track) per id
+        self.ring_of = bytearray(255)  # id -> index in rings
+
+    def register(self, name, track=1):
+        """
+        Returns the id of an event name, registering it once.
+
+        Args:
+            name: Event name, e.g. "mqtt.check_msg".
+            track: Timeline the events are shown on; code running from
+                timer callbacks uses its own track so nesting stays valid.
+        """
+        for i, (known, _) in enumerate(self.names):
+            if known == name:
+                return i
+        if len(self.names) >= 255:
+            raise ValueError("Too many trace names")
+        if track not in self.ring_tracks:
+            self.ring_tracks.append(track)
+            self.rings.append(_Ring(self.events))
+        self.names.append((name, track))
+        event_id = len(self.names) - 1
+        self.ring_of[event_id] = self.ring_tracks.index(track)
+        return event_id
+
+    def begin(self, event_id):
+        """
+        Records the begin of an event.
+        """
+        self.rings[self.ring_of[event_id]].record(event_id, PHASE_BEGIN)
+
+    def end(self, event_id):
+        """
+        Records the end of an event.
+        """
+        self.rings[self.ring_of[event_id]].record(event_id, PHASE_END)
+
+    def instant(self, event_id):
+        """
+        Records a point in time, e.g. a screen switch.
+        """
+        self.rings[self.ring_of[event_id]].record(event_id, PHASE_INSTANT)
+
+    def clear(self):
+        """
+        Forgets all events.
+        """
+        for ring in self.rings:
+            ring.clear()
+
+    def dump(self, path=TRACE_FILE):
+        """
+        Writes the recorded events, per track and oldest first, to a file.
+
+        Returns:
+            int: Number of events written.
+        """
+        n = 0
+        with open(path, "wb") as f:
+            f.write(struct.pack(_HEADER, _MAGIC, len(self.names), _TICKS_BITS,
+                                len(self.rings), time.ticks_us()))
+            for name, track in self.names:
+                encoded = name.encode()
+                f.write(bytes((len(encoded), track)))
+                f.write(encoded)
+            for ring in self.rings:
+                n += ring.write(f)
+        print(f"Trace: {n} events written to {path}")
+        return n
+
+
+# The shared tracer, None when tracing is disabled
+tracer = Tracer() if TRACE_ENABLED else None
+
+
+def traced(name, track=1):
+    """
+    Decorator recording begin/end events around every call of a function.
+
+    With tracing disabled the function is returned unchanged, so traced
+    code costs nothing.
+    """
+    def decorate(func):
+        if tracer is None:
+            return func
+        event_id = tracer.register(name, track)
+
+        def wrapper(*args, **kwargs):
+            tracer.begin(event_id)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                tracer.end(event_id)
+        return wrapper
+    return decorate
+
+
+def dump(path=TRACE_FILE):
+    """
+    Writes the trace to flash if tracing is enabled, e.g. from the REPL or
+    after a fault.
+    """
+    if tracer is not None:
+        return tracer.dump(path)
+    return 0
@@ -1,10 +1,124 @@
 # weather.py
 import lvgl as lv
-import urequests
-import json
-import time
-from secrets import OPENWEATHERMAP_API_KEY, OPENWEATHERMAP_CITY, OPENWEATHERMAP_COUNTRY
-from timer import Timer
+from store import TextBinding
+from memory import governor
+from forecast import decode_icon
+import fonts
+
+# Icons kept in memory at the same time, each in its own preallocated slot
+ICON_SLOTS = 4
+# Distinct OpenWeatherMap icons: 9 conditions by day and by night
+ICON_CODES = 18
+# 48x48 RGB565 plus the 12 byte LVGL header written by scripts/convert_icons.py
+ICON_BUFFER_SIZE = 48 * 48 * 2 + 12
+# Cells per row of the forecast screen, 48 px each on the 240 px display
+FORECAST_CELLS = 5
+
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+
+
+class IconCache:
+    """
+    Weather icons loaded into a fixed number of preallocated slots.
+
+    Icons are read from the file system into their slot and evicted least
+    recently used first. One cache is shared by all screens, so an icon
+    shown on several screens is loaded once. Every screen declares the
+    icons it shows with hold(); held icons are never evicted, as their
+    descriptors are still referenced by an lv.img. The slots are a fixed
+    cost: they are not released under memory pressure, as forgetting
+    cached icons would free nothing.
+    """
+
+    def __init__(self, name="icons", slots=ICON_SLOTS):
+        """
+        Initializes the IconCache.
+
+        Args:
+            name: Name of the governor buffer holding the slots.
+            slots: Number of icons kept at the same time, at least the
+                number of icons held at once plus one.
+        """
+        self.slots = min(slots, ICON_CODES)
+        self.buffer = governor.preallocate(name, self.slots * ICON_BUFFER_SIZE)
+        # icon code -> (slot, descriptor); lru is oldest first
+        self.cache = {}
+        self.lru = []
+        # owner -> icon codes it shows
+        self.held = {}
+
+    def hold(self, owner, codes):
+        """
+        Sets the icons shown by an owner, e.g. a screen's store prefix.
+        """
+        self.held[owner] = tuple(codes)
+
+    def _is_held(self, code):
+        for codes in self.held.values():
+            if code in codes:
+                return True
+        return False
+
+    def _free_slot(self, keep):
+        """
+        Returns an unused slot, evicting the least recently used icon that
+        is neither held nor in keep.
+        """
+        used = [slot for slot, _ in self.cache.values()]
+        for slot in range(self.slots):
+            if slot not in used:
+                return slot
+        for code in self.lru:
+            if code not in keep and not self._is_held(code):
+                self.lru.remove(code)
+                return self.cache.pop(code)[0]
+        raise MemoryError("No free icon slot")
+
+    def get(self, icon_code, keep=()):
+        """
+        Load weather icon from file system.
+        Icon codes: 01d, 01n, 02d, 02n, etc.
+        Icons should be 48x48 RGB565 raw binary files.
+        """
+        if not icon_code:
+            return None
+
+        # Use cache
+        if icon_code in self.cache:
+            self.lru.remove(icon_code)
+            self.lru.append(icon_code)
+            return self.cache[icon_code][1]
+
+        icon_path = f"icons/{icon_code}.bin"
+        try:
+            slot = self._free_slot(keep)
+            start = slot * ICON_BUFFER_SIZE
+            # Load icon file as raw RGB565 data into its preallocated slot
+            with open(icon_path, 'rb') as f:
+                size = f.readinto(memoryview(self.buffer)[start:start + ICON_BUFFER_SIZE])
+            icon_data = memoryview(self.buffer)[start:start + size]
+
+            # Create LVGL Image Descriptor for RGB565 Raw
+            img_dsc = lv.img_dsc_t({
+                'header': {
+                    'always_zero': 0,
+                    'w': 48,
+                    'h': 48,
+                    'cf': lv.img.CF.TRUE_COLOR,
+                },
+                'data': icon_data,
+                'data_size': len(icon_data),
+            })
+
+            # Cache the icon
+            self.cache[icon_code] = (slot, img_dsc)
+            self.lru.append(icon_code)
+            print(f"Loaded weather icon: {icon_code} ({len(icon_data)} bytes)")
+            return img_dsc
+
+        except Exception as e:
+            print(f"Error loading icon {icon_code}: {e}")
+            return None
 
 
 class WeatherScreen:
@@ -12,19 +126,23 @@ class WeatherScreen:
     A screen to display weather information with time, date and icons.
     """
 
-    def __init__(self, mqtt):
+    def __init__(self, store, icons, prefix="weather.0.", title="Wetter"):
         """
         Initializes the WeatherScreen.
 
         Args:
-            mqtt: The MQTT client instance for communication.
+            store: The Store holding the weather values.
+            icons: The IconCache shared by all screens.
+            prefix: Store key prefix of the location shown.
+            title: Title text, e.g. the city name.
         """
-        self.mqtt = mqtt
+        self.store = store
+        self.prefix = prefix
         self.screen = lv.obj()
 
         # Title
         self.title_label = lv.label(self.screen)
-        self.title_label.set_text("Wetter")
+        self.title_label.set_text(fonts.text(title))
         self.title_label.align(lv.ALIGN.TOP_MID, 0, 5)
 
         # Time & Date
@@ -45,12 +163,12 @@ class WeatherScreen:
 
         # Temperature (large)
         self.temperature_label = lv.label(self.screen)
-        self.temperature_label.set_text("-- C")
+        self.temperature_label.set_text(fonts.text("--°C"))
         self.temperature_label.align(lv.ALIGN.CENTER, 0, 25)
 
         # Feels Like Temperature
         self.feels_like_label = lv.label(self.screen)
-        self.feels_like_label.set_text("Feels like: -- C")
+        self.feels_like_label.set_text(fonts.text("Feels like: --°C"))
         self.feels_like_label.align(lv.ALIGN.CENTER, 0, 45)
 
         # Humidity & Pressure (side-by-side)
@@ -67,19 +185,32 @@ class WeatherScreen:
         self.wind_label.set_text("Wind: -- km/h")
         self.wind_label.align(lv.ALIGN.BOTTOM_MID, 0, -10)
 
-        # Icon Cache
-        self.icon_cache = {}
+        self.icons = icons
         self.current_icon_code = None
-
-        # Update time and weather
-        self.update_time()
-        self.update_weather()
-
-        # Timer for time update (every second)
-        self.time_timer = Timer(self.update_time, 1000)
-
-        # Timer for weather update (every 10 minutes)
-        self.weather_timer = Timer(self.update_weather, 600000)
+        # Labels follow the store, text is only rebuilt when its inputs change
+        p = prefix
+        self.bindings = [
+            # Published by clock.Clock, the date changes once a day
+            TextBinding(store, self.time_label, ("clock.time",), str),
+            TextBinding(store, self.date_label, ("clock.date",), str),
+            TextBinding(store, self.weather_label,
+                        (p + "status", p + "description"), self._render_description,
+                        partial=True),
+            TextBinding(store, self.temperature_label,
+                        (p + "temp",), lambda t: fonts.text(f"{t:.1f}°C")),
+            TextBinding(store, self.feels_like_label,
+                        (p + "feels_like",), lambda t: fonts.text(f"Feels like: {t:.1f}°C")),
+            TextBinding(store, self.humidity_label,
+                        (p + "humidity",), lambda h: f"{h}%"),
+            TextBinding(store, self.pressure_label,
+                        (p + "pressure",), lambda p: f"{p} hPa"),
+            # m/s to km/h
+            TextBinding(store, self.wind_label,
+                        (p + "wind",), lambda w: f"Wind: {w * 3.6:.1f} km/h"),
+        ]
+        self._icon_callback = self.show_icon
+        store.subscribe(p + "icon", self._icon_callback)
+        self.show_icon(p + "icon", store.get(p + "icon"))
 
     def get_screen(self):
         """
@@ -87,138 +218,173 @@ class WeatherScreen:
         """
         return self.screen
 
-    @staticmethod
-    def _replace_umlauts(text):
+    def _render_description(self, status, description):
         """
-        Replace German umlauts with ASCII equivalents.
+        Returns the text of the description label. Either value may still
+        be unset, e.g. when the first fetch failed.
         """
-        replacements = {
-            'ä': 'ae', 'Ä': 'Ae',
-            'ö': 'oe', 'Ö': 'Oe',
-            'ü': 'ue', 'Ü': 'Ue',
-            'ß': 'ss',
-            '°': ''  # Grad-Zeichen entfernen
-        }
-        for umlaut, replacement in replacements.items():
-            text = text.replace(umlaut, replacement)
-        return text
-
-    def _load_weather_icon(self, icon_code):
+        if status is not None and status != "ok":
+            return status
+        if not description:
+            return "..."
+        description = description[0].upper() + description[1:]
+        return fonts.text(description)
+
+    def show_icon(self, key, icon_code):
         """
-        Load weather icon from file system.
-        Icon codes: 01d, 01n, 02d, 02n, etc.
-        Icons should be 48x48 RGB565 raw binary files.
+        Shows the icon for the given OpenWeatherMap icon code.
         """
-        if not icon_code:
-            return None
+        if icon_code and icon_code != self.current_icon_code:
+            # The shown icon stays held until the new one is loaded
+            icon_dsc = self.icons.get(icon_code)
+            if icon_dsc:
+                self.weather_icon.set_src(icon_dsc)
+                self.current_icon_code = icon_code
+                self.icons.hold(self.prefix, (icon_code,))
 
-        # Use cache
-        if icon_code in self.icon_cache:
-            return self.icon_cache[icon_code]
 
-        icon_path = f"icons/{icon_code}.bin"
-        try:
-            # Load icon file as raw RGB565 data
-            with open(icon_path, 'rb') as f:
-                icon_data = f.read()
+class ForecastCell:
+    """
+    A reusable 48 px wide forecast cell: heading, icon and two text lines.
 
+    Cells are created once and updated in place; text is only set when it
+    changes.
+    """
 
+    WIDTH = 48
+    HEIGHT = 100
 
-            # Create LVGL Image Descriptor for RGB565 Raw
-            img_dsc = lv.img_dsc_t({
-                'header': {
-                    'always_zero': 0,
-                    'w': 48,
-                    'h': 48,
-                    'cf': lv.img.CF.TRUE_COLOR,
-                },
-                'data': icon_data,
-                'data_size': len(icon_data),
-            })
+    def __init__(self, parent):
+        """
+        Initializes the ForecastCell.
 
-            # Cache the icon
-            self.icon_cache[icon_code] = img_dsc
-            print(f"Loaded weather icon: {icon_code} ({len(icon_data)} bytes)")
-            return img_dsc
+        Args:
+            parent: The LVGL parent object.
+        """
+        self.box = lv.obj(parent)
+        self.box.set_size(self.WIDTH, self.HEIGHT)
+        self.box.set_style_pad_all(0, 0)
+        self.box.set_style_border_width(0, 0)
+        self.labels = []
+        for y in (0, 64, 82):
+            label = lv.label(self.box)
+            label.align(lv.ALIGN.TOP_MID, 0, y)
+            self.labels.append(label)
+        self.texts = ["", "", ""]
+        self.icon = lv.img(self.box)
+        self.icon.align(lv.ALIGN.TOP_MID, 0, 16)
+        self.icon.add_flag(lv.obj.FLAG.HIDDEN)
+        self.icon_code = None
+
+    def set(self, heading, line1, line2, icon_code=None, icon_dsc=None):
+        """
+        Updates the cell.
+        """
+        for i, text in enumerate((heading, line1, line2)):
+            if text != self.texts[i]:
+                self.labels[i].set_text(text)
+                self.texts[i] = text
+        if icon_dsc is None:
+            # Empty cell or missing icon: never leave a stale image behind
+            if self.icon_code is not None:
+                self.icon.add_flag(lv.obj.FLAG.HIDDEN)
+                self.icon_code = None
+        elif icon_code != self.icon_code:
+            self.icon.set_src(icon_dsc)
+            if self.icon_code is None:
+                self.icon.clear_flag(lv.obj.FLAG.HIDDEN)
+            self.icon_code = icon_code
+
+
+class ForecastScreen:
+    """
+    A screen with the next hours and the next days of the forecast.
 
-        except Exception as e:
-            print(f"Error loading icon {icon_code}: {e}")
-            return None
+    Both rows are built from ForecastCells and filled from the compact
+    Forecast of an HttpForecastSource whenever its revision changes.
+    """
 
-    def update_time(self, timer=None):
+    def __init__(self, store, forecast, icons, prefix="weather.0.", title="Forecast"):
         """
-        Updates the time and date display.
+        Initializes the ForecastScreen.
+
+        Args:
+            store: The Store carrying the forecast revision.
+            forecast: The Forecast filled by the source.
+            icons: The IconCache shared by all screens.
+            prefix: Store key prefix of the location shown.
+            title: Title text, e.g. the city name.
         """
-        try:
-            current_time = time.localtime()
-            # Format: HH:MM:SS
-            time_str = "{:02d}:{:02d}:{:02d}".format(
-                current_time[3], current_time[4], current_time[5]
-            )
-            # Format: DD Mon YYYY
-            months = ["Jan", "Feb", "Mar", "Apr", "May", "Jun",
-                      "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
-            date_str = "{:02d} {} {}".format(
-                current_time[2], months[current_time[1] - 1], current_time[0]
-            )
-
-            self.time_label.set_text(time_str)
-            self.date_label.set_text(date_str)
-        except Exception as e:
-            print(f"Error updating time: {e}")
+        self.forecast = forecast
+        self.screen = lv.obj()
 
-    def update_weather(self, timer=None):
+        self.title_label = lv.label(self.screen)
+        self.title_label.set_text(fonts.text(title))
+        self.title_label.align(lv.ALIGN.TOP_MID, 0, 5)
+
+        self.hours = self._row(28)
+        self.days = self._row(140)
+
+        self.status_label = lv.label(self.screen)
+        self.status_label.set_text("...")
+        self.status_label.align(lv.ALIGN.BOTTOM_MID, 0, -10)
+
+        self.icons = icons
+        self.owner = "forecast." + prefix
+        self.bindings = [
+            TextBinding(store, self.status_label,
+                        (prefix + "forecast_status",), self._render_status),
+        ]
+        self._callback = self.render
+        store.subscribe(prefix + "forecast", self._callback)
+        if store.get(prefix + "forecast") is not None:
+            self.render()
+
+    def _row(self, y):
+        cells = []
+        for i in range(FORECAST_CELLS):
+            cell = ForecastCell(self.screen)
+            cell.box.align(lv.ALIGN.TOP_LEFT, i * ForecastCell.WIDTH, y)
+            cells.append(cell)
+        return cells
+
+    def get_screen(self):
         """
-        Fetches and displays the current weather with icon.
+        Returns the screen object.
         """
-        url = f"http://api.openweathermap.org/data/2.5/weather?q={OPENWEATHERMAP_CITY},{OPENWEATHERMAP_COUNTRY}&appid={OPENWEATHERMAP_API_KEY}&units=metric&lang=en"
-        try:
-            print("Fetching weather data...")
-            response = urequests.get(url)
-            data = json.loads(response.text)
-            response.close()
-
-            if data and "main" in data and "weather" in data:
-                # Weather Icon
-                icon_code = data["weather"][0]["icon"]
-                if icon_code != self.current_icon_code:
-                    icon_dsc = self._load_weather_icon(icon_code)
-                    if icon_dsc:
-                        self.weather_icon.set_src(icon_dsc)
-                        self.current_icon_code = icon_code
-
-                # Weather Description
-                weather_desc = data["weather"][0]["description"]
-                if weather_desc:
-                    weather_desc = weather_desc[0].upper() + weather_desc[1:]
-                weather_desc = self._replace_umlauts(weather_desc)
-                self.weather_label.set_text(f"{weather_desc}")
-
-                # Temperature
-                temp = data["main"]["temp"]
-                self.temperature_label.set_text(f"{temp:.1f} C")
-
-                # Feels Like Temperature
-                feels_like = data["main"]["feels_like"]
-                self.feels_like_label.set_text(f"Feels like: {feels_like:.1f} C")
-
-                # Humidity
-                humidity = data["main"]["humidity"]
-                self.humidity_label.set_text(f"{humidity}%")
-
-                # Pressure
-                pressure = data["main"]["pressure"]
-                self.pressure_label.set_text(f"{pressure} hPa")
-
-                # Wind
-                wind_speed = data["wind"]["speed"] * 3.6  # m/s to km/h
-                self.wind_label.set_text(f"Wind: {wind_speed:.1f} km/h")
-
-                print("Weather data updated successfully")
-            else:
-                self.weather_label.set_text("N/A")
-                print("Invalid weather data received")
+        return self.screen
 
-        except Exception as e:
-            print(f"Error fetching weather: {e}")
-            self.weather_label.set_text("Error")
\ No newline at end of file
+
+    def _render_status(self, status):
+        if status != "ok":
+            return status
+        return f"{len(self.forecast)} x 3 h"
+
+    def _fill(self, cell, heading, line1, line2, icon):
+        code = decode_icon(icon)
+        # The cell's old icon may be evicted, those of the other cells not
+        keep = [other.icon_code for other in self.hours + self.days if other is not cell]
+        cell.set(heading, line1, line2, code, self.icons.get(code, keep))
+
+    def render(self, key=None, revision=None):
+        """
+        Fills the cells from the forecast.
+        """
+        f = self.forecast
+        # While filling, the cells pass the icons to keep themselves
+        self.icons.hold(self.owner, ())
+        for i, cell in enumerate(self.hours):
+            if i >= f.count:
+                cell.set("", "", "")
+                continue
+            hour = (f.stamps[i] + f.utc_offset) % 86400 // 3600
+            self._fill(cell, f"{hour:02d}h", fonts.text(f"{f.temps[i] / 10:.0f}°C"),
+                       f"{f.pops[i]}%", f.icons[i])
+        for i, cell in enumerate(self.days):
+            if i >= f.days:
+                cell.set("", "", "")
+                continue
+            weekday = WEEKDAYS[((f.day_stamps[i] + f.utc_offset) // 86400 + 3) % 7]
+            self._fill(cell, weekday, fonts.text(f"{f.day_max[i] / 10:.0f}°C"),
+                       fonts.text(f"{f.day_min[i] / 10:.0f}°C"), f.day_icons[i])
+        self.icons.hold(self.owner, [cell.icon_code for cell in self.hours + self.days])
@@ -0,0 +1,394 @@
+# weather_source.py
+import json
+import time
+from secrets import OPENWEATHERMAP_API_KEY, OPENWEATHERMAP_CITY, OPENWEATHERMAP_COUNTRY
+from timer import Timer
+from memory import governor
+from http_pool import pool
+from forecast import Forecast, ForecastParser
+from mqtt_client import PRIORITY_HIGH
+from tracer import traced
+from knobs import knobs
+
+try:
+    from secrets import WEATHER_SOURCE
+except ImportError:
+    WEATHER_SOURCE = "http"  # "http", "mqtt" or "mqtt+http"
+
+try:
+    from secrets import OPENWEATHERMAP_SCHEME
+except ImportError:
+    OPENWEATHERMAP_SCHEME = "http"  # "https" uses the pooled TLS connection
+
+try:
+    from secrets import WEATHER_TOPIC
+except ImportError:
+    WEATHER_TOPIC = "Weather/current"
+
+try:
+    from secrets import WEATHER_LOCATIONS
+except ImportError:
+    WEATHER_LOCATIONS = [(OPENWEATHERMAP_CITY, OPENWEATHERMAP_COUNTRY)]
+
+# Preallocated buffer for the HTTP response body (current weather is ~600 bytes)
+HTTP_BUFFER_SIZE = 2048
+# The forecast (~16 KB) is streamed through a small buffer instead
+FORECAST_CHUNK_SIZE = 512
+
+# Compact record published by scripts/weather_bridge.py, a JSON list:
+# [version, timestamp (Unix), icon, temp, feels_like, humidity, pressure, wind (m/s), description]
+RECORD_VERSION = 1
+RECORD_KEYS = (
+    "icon",
+    "temp",
+    "feels_like",
+    "humidity",
+    "pressure",
+    "wind",
+    "description",
+)
+
+# Refresh periods (ms); at least a minute to stay within the API quota
+WEATHER_INTERVAL = knobs.define("weather.interval_ms", 600000, 60000, 86400000)
+FORECAST_INTERVAL = knobs.define("forecast.interval_ms", 1800000, 60000, 86400000)
+
+# Seconds between the Unix epoch and the epoch of time.time()
+_UNIX_OFFSET = 946684800 if time.gmtime(0)[0] == 2000 else 0
+
+
+def location_prefix(index):
+    """
+    Returns the store key prefix of a location, e.g. "weather.0.".
+    """
+    return f"weather.{index}."
+
+
+class _PolledSource:
+    """
+    Start/stop handling shared by the HTTP sources: refreshes are paced by
+    a RefreshScheduler if one is given, otherwise by an own timer.
+    """
+
+    def __init__(self, interval, scheduler, key, knob):
+        if interval is None:
+            interval = knob.value
+            knobs.watch(knob.name, self.set_interval)
+        self.interval = interval
+        self.scheduler = scheduler
+        self.key = key
+        self.timer = None
+        self._keep_connection()
+
+    def _keep_connection(self):
+        # Room for the scheduler staggering and delaying the requests
+        pool.keep_idle(self.interval + self.interval // 4)
+
+    def set_interval(self, name, interval):
+        """
+        Changes the refresh period (knob watcher).
+        """
+        self.interval = interval
+        self._keep_connection()
+        if self.scheduler is not None:
+            self.scheduler.set_interval(self.key, interval)
+        if self.timer is not None:
+            self.timer.set_period(interval)
+
+    def start(self):
+        """
+        Starts the periodic refresh. Without a scheduler the data is
+        fetched right away. Requires a network connection.
+        """
+        if self.scheduler is not None:
+            # A screen shown with data older than half the interval refreshes
+            self.scheduler.add(self.key, self.update, self.interval, self.interval // 2)
+            return
+        self.update()
+        if self.timer is None:
+            self.timer = Timer(self.update, self.interval)
+
+    def stop(self):
+        """
+        Stops the periodic refresh.
+        """
+        if self.scheduler is not None:
+            self.scheduler.remove(self.key)
+        if self.timer is not None:
+            self.timer.delete()
+            self.timer = None
+
+
+class HttpWeatherSource(_PolledSource):
+    """
+    Fetches the current weather from OpenWeatherMap and writes it into the store.
+
+    The source knows nothing about widgets; every screen showing weather data
+    subscribes to the keys under its prefix instead.
+    """
+
+    def __init__(self, store, city=OPENWEATHERMAP_CITY, country=OPENWEATHERMAP_COUNTRY,
+                 prefix="weather.0.", interval=None, scheduler=None, key=None):
+        """
+        Initializes the HttpWeatherSource.
+
+        Args:
+            store: The Store receiving the weather values.
+            city: City name.
+            country: Country code.
+            prefix: Store key prefix of this location.
+            interval: Refresh period in ms (default: the "weather.interval_ms"
+                knob, 10 minutes).
+            scheduler: Optional RefreshScheduler pacing all locations.
+            key: Scheduler job key, usually the screen name.
+        """
+        super().__init__(interval, scheduler, key or prefix, WEATHER_INTERVAL)
+        self.store = store
+        self.prefix = prefix
+        self.url = f"{OPENWEATHERMAP_SCHEME}://api.openweathermap.org/data/2.5/weather?q={city},{country}&appid={OPENWEATHERMAP_API_KEY}&units=metric&lang=en"
+
+    @traced("weather.update")
+    def update(self, timer=None):
+        """
+        Fetches the current weather and publishes it to the store.
+        """
+        try:
+            print("Fetching weather data...")
+            buf = governor.preallocate("http", HTTP_BUFFER_SIZE)
+            # Keep-alive connection from the pool, TLS is only paid once for https
+            status, body = pool.get(self.url, buf)
+            if status != 200:
+                raise ValueError(f"HTTP status {status}")
+            # json.loads accepts the memoryview, no str copy of the body
+            data = json.loads(body)
+
+            if data and "main" in data and "weather" in data:
+                p = self.prefix
+                self.store.update({
+                    p + "icon": data["weather"][0]["icon"],
+                    p + "description": data["weather"][0]["description"],
+                    p + "temp": data["main"]["temp"],
+                    p + "feels_like": data["main"]["feels_like"],
+                    p + "humidity": data["main"]["humidity"],
+                    p + "pressure": data["main"]["pressure"],
+                    p + "wind": data["wind"]["speed"],
+                    p + "source": "http",
+                    p + "status": "ok",
+                })
+                print("Weather data updated successfully")
+            else:
+                self.store.set(self.prefix + "status", "N/A")
+                print("Invalid weather data received")
+
+        except Exception as e:
+            print(f"Error fetching weather: {e}")
+            self.store.set(self.prefix + "status", "Error")
+
+
+class HttpForecastSource(_PolledSource):
+    """
+    Fetches the 5 day / 3 hour forecast with a single request per refresh.
+
+    The response is streamed through a small buffer into a ForecastParser,
+    so it never exists as a whole in memory. The Forecast is shared with
+    the screen; the store key prefix + "forecast" carries its revision.
+    """
+
+    def __init__(self, store, city=OPENWEATHERMAP_CITY, country=OPENWEATHERMAP_COUNTRY,
+                 prefix="weather.0.", interval=None, scheduler=None, key=None):
+        """
+        Initializes the HttpForecastSource.
+
+        Args:
+            store: The Store receiving the forecast revision.
+            city: City name.
+            country: Country code.
+            prefix: Store key prefix of this location.
+            interval: Refresh period in ms (default: the "forecast.interval_ms"
+                knob, 30 minutes).
+            scheduler: Optional RefreshScheduler pacing all requests.
+            key: Scheduler job key, usually the screen name.
+        """
+        super().__init__(interval, scheduler, key or prefix + "forecast", FORECAST_INTERVAL)
+        self.store = store
+        self.prefix = prefix
+        self.forecast = Forecast()
+        self.parser = ForecastParser(self.forecast)
+        self.parse_ms = 0
+        self.url = f"{OPENWEATHERMAP_SCHEME}://api.openweathermap.org/data/2.5/forecast?q={city},{country}&appid={OPENWEATHERMAP_API_KEY}&units=metric&lang=en"
+
+    @traced("forecast.update")
+    def update(self, timer=None):
+        """
+        Fetches the forecast and publishes its new revision to the store.
+        """
+        try:
+            print("Fetching forecast...")
+            buf = governor.preallocate("forecast", FORECAST_CHUNK_SIZE)
+            start = time.ticks_ms()
+            self.parser.reset()
+            status = pool.stream(self.url, self.parser.feed, buf)
+            if status != 200:
+                raise ValueError(f"HTTP status {status}")
+            if not self.parser.finish():
+                raise ValueError("No forecast entries")
+            self.parse_ms = time.ticks_diff(time.ticks_ms(), start)
+            self.store.update({
+                self.prefix + "forecast": self.forecast.revision,
+                self.prefix + "forecast_status": "ok",
+            })
+            print(f"Forecast updated: {self.forecast.count} slots in {self.parse_ms} ms")
+        except Exception as e:
+            print(f"Error fetching forecast: {e}")
+            self.store.set(self.prefix + "forecast_status", "Error")
+
+
+class MqttWeatherSource:
+    """
+    Reads the weather from a retained MQTT topic fed by scripts/weather_bridge.py.
+
+    The bridge fetches OpenWeatherMap once for all units and publishes a
+    compact record, so the device does no DNS, HTTP or large JSON work.
+    """
+
+    def __init__(self, mqtt, store, topic=WEATHER_TOPIC, prefix="weather.0.", max_age_s=1800):
+        """
+        Initializes the MqttWeatherSource.
+
+        Args:
+            mqtt: The MQTT client instance for communication.
+            store: The Store receiving the weather values.
+            topic: The retained topic carrying the record.
+            prefix: Store key prefix of this location.
+            max_age_s: Records older than this count as stale.
+        """
+        self.mqtt = mqtt
+        self.store = store
+        self.topic = topic
+        self.prefix = prefix
+        self.max_age_s = max_age_s
+        self.received = None  # ticks_ms of the last valid record
+        self.record_time = 0  # Bridge timestamp (time.time() epoch)
+
+    def start(self):
+        """
+        Subscribes to the weather topic; the broker sends the retained record.
+        The record is rare and small, so it is dispatched ahead of sensors.
+        """
+        self.mqtt.set_limit(self.topic, priority=PRIORITY_HIGH)
+        self.mqtt.subscribe(self.topic, self.handle_record)
+
+    def stop(self):
+        """
+        Nothing to stop: the subscription stays and keeps the values current.
+        """
+
+    def handle_record(self, topic, msg):
+        """
+        Decodes a compact weather record and publishes it to the store.
+        """
+        try:
+            record = json.loads(msg)
+            if record[0] != RECORD_VERSION:
+                raise ValueError(f"Unsupported record version {record[0]}")
+            p = self.prefix
+            values = {p + key: record[i + 2] for i, key in enumerate(RECORD_KEYS)}
+            values[p + "source"] = "mqtt"
+            values[p + "status"] = "ok"
+            self.record_time = record[1] - _UNIX_OFFSET
+            self.received = time.ticks_ms()
+            self.store.update(values)
+        except Exception as e:
+            print(f"Error handling weather record: {e}")
+
+    def is_fresh(self):
+        """
+        Returns True if a record was received and is not older than max_age_s.
+        """
+        if self.received is None:
+            return False
+        if time.gmtime()[0] < 2021:
+            # RTC not synced yet, judge by arrival instead
+            age = time.ticks_diff(time.ticks_ms(), self.received) // 1000
+        else:
+            age = time.time() - self.record_time
+        return age <= self.max_age_s
+
+
+class FallbackWeatherSource:
+    """
+    Uses the MQTT bridge and falls back to HTTP polling while its record is
+    missing or stale. Polling stops again once fresh records arrive.
+    """
+
+    def __init__(self, primary, fallback, check_interval=60000, grace_ms=30000):
+        """
+        Initializes the FallbackWeatherSource.
+
+        Args:
+            primary: The MqttWeatherSource.
+            fallback: The HttpWeatherSource.
+            check_interval: How often freshness is checked (ms).
+            grace_ms: How long the primary may take to deliver after start.
+        """
+        self.primary = primary
+        self.fallback = fallback
+        self.check_interval = check_interval
+        self.grace_ms = grace_ms
+        self.started = 0
+        self.using_fallback = False
+        self.timer = None
+
+    def start(self):
+        """
+        Starts the primary source and the freshness check.
+        """
+        self.primary.start()
+        self.started = time.ticks_ms()
+        if self.timer is None:
+            self.timer = Timer(self.check, self.check_interval)
+
+    def stop(self):
+        """
+        Stops the freshness check and the fallback.
+        """
+        if self.timer is not None:
+            self.timer.delete()
+            self.timer = None
+        self.fallback.stop()
+
+    def check(self, timer=None):
+        """
+        Switches between bridge and HTTP depending on the record's freshness.
+        """
+        if self.primary.is_fresh():
+            if self.using_fallback:
+                print("Weather bridge is back, stopping HTTP polling")
+                self.fallback.stop()
+                self.using_fallback = False
+        elif not self.using_fallback and time.ticks_diff(time.ticks_ms(), self.started) >= self.grace_ms:
+            print("Weather bridge silent, falling back to HTTP polling")
+            self.using_fallback = True
+            self.fallback.start()
+
+
+def create_sources(mqtt, store, scheduler, kind=WEATHER_SOURCE, locations=WEATHER_LOCATIONS):
+    """
+    Returns one weather source per location as (screen name, city, prefix, source).
+
+    WEATHER_SOURCE in secrets.py selects the source type. HTTP sources are
+    paced by the scheduler; with several locations each has its own bridge
+    topic, WEATHER_TOPIC + "/" + city.
+    """
+    sources = []
+    for index, (city, country) in enumerate(locations):
+        name = "Weather" if len(locations) == 1 else f"Weather {city}"
+        prefix = location_prefix(index)
+        topic = WEATHER_TOPIC if len(locations) == 1 else f"{WEATHER_TOPIC}/{city}"
+        if kind == "mqtt":
+            source = MqttWeatherSource(mqtt, store, topic, prefix)
+        else:
+            source = HttpWeatherSource(store, city, country, prefix, scheduler=scheduler, key=name)
+            if kind == "mqtt+http":
+                source = FallbackWeatherSource(MqttWeatherSource(mqtt, store, topic, prefix), source)
+        sources.append((name, city, prefix, source))
+    return sources
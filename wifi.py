@@ -1,44 +1,265 @@
 import network
 import time
+import ubinascii
+import ujson
 from status_led import StatusLed
 from secrets import WIFI_CREDENTIALS
 
+# Last good connection, read on boot for a scan-less reconnect
+CACHE_FILE = "wifi_cache.json"
 
-def connect():
+# Connection states
+IDLE = 0
+CONNECTING = 1
+CONNECTED = 2
+FAILED = 3
+
+
+class WifiManager:
     """
-    Connects the device to the Wi-Fi network using credentials from secrets.py.
-    It tries each network in the 'WIFI_CREDENTIALS' list until a connection is established.
+    Non-blocking Wi-Fi connection manager.
+
+    On start it first tries the network, BSSID and channel cached from the
+    last good connection. If that fails it scans once, ranks the known
+    networks by RSSI and tries them strongest first. poll() advances the
+    state machine and reconnects in the background after a link loss.
+
+    A credentials entry may set "static_ip": True to reuse the cached IP
+    configuration instead of waiting for DHCP.
     """
-    led = StatusLed()
-    wlan = network.WLAN(network.STA_IF)
-    wlan.active(True)
-
-    for creds in WIFI_CREDENTIALS:
-        wlan.disconnect()
-        time.sleep(1)  # Give time to disconnect
-
-        ssid = creds.get("ssid")
-        password = creds.get("password")
-
-        print(f"Connecting to network {ssid}...")
-        wlan.connect(ssid, password)
-
-        max_wait = 10
-        while max_wait > 0:
-            led.wifi_connecting()
-            if wlan.isconnected():
-                break
-            max_wait -= 1
-            print("Waiting for connection...")
-            time.sleep(1)
-
-        if wlan.isconnected():
-            print("Connected")
-            status = wlan.ifconfig()
-            print(f"ip = {status[0]}")
-            led.set_color(0, 255, 0)  # Green for connected
+
+    def __init__(self, credentials=WIFI_CREDENTIALS, led=None, cache_file=CACHE_FILE,
+                 connect_timeout_ms=10000, cached_timeout_ms=4000, retry_ms=5000):
+        """
+        Initializes the WifiManager.
+
+        Args:
+            credentials: List of {"ssid": ..., "password": ...} dicts.
+            led: Optional StatusLed for connection feedback.
+            cache_file: Flash file holding the last good connection.
+            connect_timeout_ms: Time allowed per connection attempt.
+            cached_timeout_ms: Time allowed for the cached network before scanning.
+            retry_ms: Pause before a new round after every network failed.
+        """
+        self.credentials = credentials
+        self.led = led
+        self.failure_code = None  # LED pattern shown after the last failed attempt
+        self.cache_file = cache_file
+        self.connect_timeout_ms = connect_timeout_ms
+        self.cached_timeout_ms = cached_timeout_ms
+        self.retry_ms = retry_ms
+
+        self.wlan = network.WLAN(network.STA_IF)
+        self.state = IDLE
+        self.cache = self._load_cache()
+        self.candidates = []
+        self.current = None
+        self.attempt_start = 0
+        self.retry_at = None
+        self.start_ms = 0
+        self.connect_ms = None  # Time from start() to connected
+        self.boot_to_connected_ms = None  # Time from boot to the first connection
+
+    def _load_cache(self):
+        try:
+            with open(self.cache_file) as f:
+                return ujson.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save_cache(self, cache):
+        if cache == self.cache:
+            return  # Avoid flash writes when nothing changed
+        try:
+            with open(self.cache_file, "w") as f:
+                ujson.dump(cache, f)
+            self.cache = cache
+        except OSError as e:
+            print(f"Could not write Wi-Fi cache: {e}")
+
+    def _password(self, ssid):
+        for creds in self.credentials:
+            if creds.get("ssid") == ssid:
+                return creds
+        return None
+
+    def _cached_candidate(self):
+        if not self.cache:
+            return None
+        creds = self._password(self.cache.get("ssid"))
+        if creds is None:
+            return None
+        return {
+            "creds": creds,
+            "bssid": ubinascii.unhexlify(self.cache["bssid"]) if self.cache.get("bssid") else None,
+            "channel": self.cache.get("channel"),
+            "cached": True,
+        }
+
+    def _scan_candidates(self):
+        """
+        Scans once and returns the known networks, strongest first.
+        """
+        print("Scanning for Wi-Fi networks...")
+        found = {}
+        try:
+            results = self.wlan.scan()
+        except OSError as e:
+            print(f"Wi-Fi scan failed: {e}")
+            results = []
+        # Entries are (ssid, bssid, channel, RSSI, security, hidden)
+        for result in results:
+            ssid = result[0].decode()
+            creds = self._password(ssid)
+            if creds is None:
+                continue
+            rssi = result[3]
+            if ssid not in found or rssi > found[ssid]["rssi"]:
+                found[ssid] = {"creds": creds, "bssid": result[1], "channel": result[2],
+                               "rssi": rssi, "cached": False}
+        candidates = sorted(found.values(), key=lambda c: c["rssi"], reverse=True)
+        for c in candidates:
+            print(f"  {c['creds']['ssid']}: {c['rssi']} dBm (channel {c['channel']})")
+        return candidates
+
+    def _connect(self, candidate):
+        creds = candidate["creds"]
+        self.current = candidate
+        self.attempt_start = time.ticks_ms()
+        # Abort a connection or an attempt still in progress
+        try:
+            self.wlan.disconnect()
+        except OSError:
+            pass
+        if creds.get("static_ip") and candidate["cached"] and self.cache.get("ifconfig"):
+            self.wlan.ifconfig(tuple(self.cache["ifconfig"]))
+        else:
+            # Do not carry a static address over to another network
+            self.wlan.ifconfig("dhcp")
+        print(f"Connecting to network {creds['ssid']}...")
+        try:
+            # Pinning the BSSID skips the driver's own scan. connect() takes no
+            # channel, so the cached channel is only kept for diagnostics.
+            if candidate["bssid"]:
+                self.wlan.connect(creds["ssid"], creds.get("password"), bssid=candidate["bssid"])
+            else:
+                self.wlan.connect(creds["ssid"], creds.get("password"))
+        except OSError as e:
+            print(f"Wi-Fi connect failed: {e}")
+            self.attempt_start = time.ticks_add(self.attempt_start, -self.connect_timeout_ms)
+
+    def _next_candidate(self):
+        if not self.candidates and self.current is not None and self.current["cached"]:
+            # The cached network failed, fall back to a single scan
+            self.candidates = self._scan_candidates()
+        if self.candidates:
+            self._connect(self.candidates.pop(0))
             return
+        self.current = None
+        self.state = FAILED
+        self.retry_at = time.ticks_add(time.ticks_ms(), self.retry_ms)
+        print("Network connection failed")
+        if self.led:
+            # Two red blinks: no network
+            self.failure_code = self.led.status_code((255, 0, 0), 2)
+
+    def start(self):
+        """
+        Starts connecting without blocking.
+        """
+        self.wlan.active(True)
+        self.state = CONNECTING
+        self.start_ms = time.ticks_ms()
+        self.connect_ms = None
+        if self.led:
+            if self.failure_code is not None:
+                # Retrying, the failure code of the last attempt no longer applies
+                self.led.stop(self.failure_code)
+                self.failure_code = None
+            self.led.wifi_connecting()
+        self.current = None
+        cached = self._cached_candidate()
+        if cached:
+            self.candidates = []
+            self._connect(cached)
+        else:
+            self.candidates = self._scan_candidates()
+            self._next_candidate()
+
+    def _on_connected(self):
+        self.state = CONNECTED
+        now = time.ticks_ms()
+        self.connect_ms = time.ticks_diff(now, self.start_ms)
+        if self.boot_to_connected_ms is None:
+            self.boot_to_connected_ms = now
+        status = self.wlan.ifconfig()
+        print(f"Connected in {self.connect_ms} ms (boot to connected: {self.boot_to_connected_ms} ms)")
+        print(f"ip = {status[0]}")
+        if self.led:
+            self.led.set_color(0, 255, 0)  # Green for connected
+        bssid = self.current["bssid"]
+        self._save_cache({
+            "ssid": self.current["creds"]["ssid"],
+            "bssid": ubinascii.hexlify(bssid).decode() if bssid else None,
+            "channel": self.current["channel"],
+            "ifconfig": list(status),
+        })
+
+    def poll(self):
+        """
+        Advances the connection state machine; call this from the main loop.
+
+        Returns:
+            bool: True while connected.
+        """
+        if self.state == CONNECTED:
+            if self.wlan.isconnected():
+                return True
+            print("Wi-Fi connection lost, reconnecting...")
+            self.start()
+        elif self.state == CONNECTING:
+            if self.wlan.isconnected():
+                self._on_connected()
+                return True
+            timeout = self.cached_timeout_ms if self.current["cached"] else self.connect_timeout_ms
+            if time.ticks_diff(time.ticks_ms(), self.attempt_start) >= timeout:
+                self._next_candidate()
+        elif self.state == FAILED:
+            if time.ticks_diff(time.ticks_ms(), self.retry_at) >= 0:
+                self.start()
+        return False
+
+    def isconnected(self):
+        """
+        Returns True if the station is connected.
+        """
+        return self.state == CONNECTED
 
-    if not wlan.isconnected():
-        led.set_color(255, 0, 0)  # Red for error
-        raise RuntimeError("Network connection failed")
+    def set_power_save(self, enabled):
+        """
+        Enables Wi-Fi modem sleep between beacons (higher latency, lower
+        power) or turns it off again.
+        """
+        pm = getattr(network.WLAN, "PM_POWERSAVE" if enabled else "PM_NONE", None)
+        if pm is None:
+            return
+        try:
+            self.wlan.config(pm=pm)
+        except (OSError, ValueError) as e:
+            print(f"Wi-Fi power save not supported: {e}")
+
+
+def connect(timeout_ms=30000):
+    """
+    Connects the device to the Wi-Fi network using credentials from secrets.py.
+    Blocks until connected and returns the WifiManager, whose poll() keeps the
+    connection up in the background.
+    """
+    manager = WifiManager(led=StatusLed())
+    manager.start()
+    start = time.ticks_ms()
+    while not manager.poll():
+        if manager.state == FAILED or time.ticks_diff(time.ticks_ms(), start) >= timeout_ms:
+            raise RuntimeError("Network connection failed")
+        time.sleep_ms(50)
+    return manager